@@ -7,6 +7,8 @@ from datetime import datetime, time, timedelta
 from pathlib import Path
 import os
 import subprocess
+import queue
+import threading
 
 with open("logfile.log", "w") as log_file:
     log_file.write("")  # Clears the log file
@@ -17,6 +19,9 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s",
 )
 
+DROPDOWN_DEBOUNCE_MS = 120
+DROPDOWN_MAX_RESULTS = 50
+
 class SentiMemeApp:
     def __init__(self, root):
         self.root = root
@@ -29,8 +34,19 @@ class SentiMemeApp:
 
         self.calendar_window = None
         self.status_label = None
+        self.worker = None
+        # Window of the last failed/cancelled run, reused on retry so its cached stages still match
+        self.current_run = None
+        self.failed_run = None
+        self.status_prefix = ""
+        self.dropdown_job = None
 
         self.setup_ui()
+        self.start_coin_list_refresh()
+
+        # Start loading the NLP models in the background while the user fills in the form
+        from scripts.model_registry import ModelRegistry
+        ModelRegistry.shared().warm_up()
 
     def setup_ui(self):
         self.frame = tk.Frame(self.root, bg='blue')
@@ -50,12 +66,13 @@ class SentiMemeApp:
               bg='blue', fg='white').grid(row=1, column=0, sticky='w', pady=5)
 
         self.ticker_var = StringVar(value="Search for a ticker")
-        try:
-            from scripts.coin_list_generator import CoinListGenerator
-            self.coinlist = CoinListGenerator().get_list()
-        except RuntimeError as e:
-            messagebox.showerror("Unexpected Error", str(e))
-            self.root.destroy()
+        # The last coin list snapshot loads instantly; the search index is built (and the
+        # list refreshed if stale) in the background, see start_coin_list_refresh()
+        from scripts.coin_list_generator import CoinListGenerator
+        self.coin_generator = CoinListGenerator(fetch_if_missing=False)
+        self.coinlist = self.coin_generator.get_list()
+        self.coin_index = None
+        self.coin_updates = queue.Queue()
 
         self.ticker_entry = Entry(self.frame, textvariable=self.ticker_var, font=("Arial", 12))
         self.ticker_entry.grid(row=1, column=1, columnspan=2, sticky='ew', pady=5, padx=5)
@@ -103,6 +120,12 @@ class SentiMemeApp:
         self.status_label = Label(self.frame, text="", bg='blue', fg='white', font=("Arial", 12))
         self.status_label.grid(row=5, column=0, columnspan=3, pady=(0, 10))
 
+        # Cancel button, only shown while an analysis is running
+        self.cancel_button = Button(self.frame, text="Cancel", font=("Arial", 12),
+                                    command=self.cancel_analysis)
+        self.cancel_button.grid(row=6, column=0, columnspan=3)
+        self.cancel_button.grid_remove()
+
         # Dropdown setup
         self.setup_dropdown()
         self.check_fields()
@@ -150,6 +173,11 @@ class SentiMemeApp:
         self.check_fields()
 
     def check_fields(self):
+        if self.worker is not None and self.worker.is_alive():
+            # Keep the button disabled while an analysis is running
+            self.root.after(300, self.check_fields)
+            return
+
         ticker = self.ticker_var.get().strip()
         subreddit = self.subreddit_var.get().strip()
         start_date = self.start_date_var.get()
@@ -164,10 +192,8 @@ class SentiMemeApp:
         self.root.after(300, self.check_fields)
 
     def analyse(self):
-        # Disable button during processing
-        self.analyse_button.config(state="disabled", bg='light grey', fg='dark grey')
-        self.status_label.config(text="Running analysis...")
-        self.root.update_idletasks()
+        if self.worker is not None and self.worker.is_alive():
+            return
 
         try:
             ticker = self.ticker_var.get().split(' ')[0]
@@ -181,70 +207,87 @@ class SentiMemeApp:
 
             end_datetime = datetime.combine(self.end_date, datetime.now().time())
 
-            # Numeric Analysis
-            from scripts.Numeric_Analysis_Subsystem import NumericSubsystem
-            number_analysis = NumericSubsystem(start_datetime, end_datetime, ticker)
-            number_analysis.extract_data()
-            number_analysis.convert_df()
-            numeric_df = number_analysis.get_numeric_data_df()
-            logging.info("Numeric Analysis Completed!")
-
-            # Reddit Extraction
-            from scripts.reddit_api_fetch import RedditAPI
-
-            reddit_api = RedditAPI(subreddit, [ticker], start_datetime, end_datetime)
-            reddit_df = reddit_api.search_subreddit()
-            if reddit_df.empty:
-                self.status_label.config(text="No Reddit posts found.")
-                return
-
-            # Topic Modelling
-            try:
-                from scripts.topic_model import RedditTopicModel
-                topic_model = RedditTopicModel(reddit_df)
-                topic_model.initialize_model()
-                topic_model.fit_transform()
-                topic_model.process_topics()
-                topic_df = topic_model.get_topic_dataframe()
-                logging.info("Topic Modelling Completed!")
-            except Exception as topic_error:
-                logging.error(f"Topic modelling failed: {topic_error}")
-                messagebox.showwarning("Topic Modelling Failed due to insufficient post", "Proceeding with sentiment analysis only.")
-                topic_df = reddit_df.copy()
-                topic_df["topic"] = -1
-
-            # Sentiment Analysis
-            from scripts.sentiment_analysis import RedditSentimentAnalysis
-            sentiment_analysis = RedditSentimentAnalysis(topic_df)
-            sentiment_analysis.initialize_model()
-            sentiment_analysis.analyze_sentiment(batch_size=16)
-            sentiment_analysis.finalize_sentiment_dataframe()
-            sentiment_df = sentiment_analysis.get_sentiment_dataframe()
-            logging.info("Text Analysis Completed!")
-
-            # Merged Export
-            from scripts.export_csv import ExportCSV
-            ExportCSV(df_text=sentiment_df, df_num=numeric_df)
-            messagebox.showinfo("Analysis Completed", "Analysis Completed Successfully!")
-
-            self.find_and_open_twbx()
+            run_key = (ticker, subreddit, start_date, self.end_date)
+            # Retrying a failed run keeps its window, so its finished stages come from the stage cache
+            is_retry = self.failed_run is not None and self.failed_run[0] == run_key
+            if is_retry:
+                start_datetime, end_datetime = self.failed_run[1]
+            self.current_run = (run_key, (start_datetime, end_datetime))
 
         except ValueError as e:
             error_msg = f"Error parsing date: {e}"
             logging.error(error_msg)
             messagebox.showerror("Date Error", error_msg)
             self.status_label.config(text="")
+            return
 
-        except Exception as e:
-            error_msg = f"Unexpected error: {e}"
-            logging.error(error_msg)
-            messagebox.showerror("Unexpected Error", error_msg)
-            self.status_label.config(text="")
+        from scripts.pipeline import AnalysisPipeline
+        from scripts.analysis_worker import AnalysisWorker
 
-        finally:
-            # Re-enable the button regardless of success or error
-            self.analyse_button.config(state="normal", bg='white', fg='green')
+        # Run the pipeline in a background worker so the window stays responsive
+        # Search Reddit for the coin's id, symbol and name in a single pass
+        keywords = self.coin_generator.get_aliases(ticker)
+        pipeline = AnalysisPipeline(ticker, subreddit, start_datetime, end_datetime, keywords=keywords)
+        self.worker = AnalysisWorker(pipeline)
+
+        # Disable button during processing
+        self.analyse_button.config(state="disabled", bg='light grey', fg='dark grey')
+        self.cancel_button.config(state="normal")
+        self.cancel_button.grid()
+        # A retry silently reuses the old window, so say so for the whole run
+        self.status_prefix = f"Retry of the run ending {end_datetime:%d/%m/%Y %H:%M}: " if is_retry else ""
+        self.status_label.config(text=self.status_prefix + "Running analysis...")
 
+        self.worker.start()
+        self.root.after(100, self.poll_worker)
+
+    def poll_worker(self):
+        """Drains progress messages from the worker queue on the Tk main thread."""
+        try:
+            while True:
+                kind, payload = self.worker.messages.get_nowait()
+
+                if kind == "progress":
+                    self.status_label.config(text=self.status_prefix + payload)
+
+                elif kind == "done":
+                    self.failed_run = None
+                    self.finish_analysis()
+                    for warning in payload:
+                        messagebox.showwarning("Topic Modelling Failed", warning)
+                    messagebox.showinfo("Analysis Completed", "Analysis Completed Successfully!")
+                    self.find_and_open_twbx()
+                    return
+
+                elif kind == "cancelled":
+                    self.failed_run = self.current_run
+                    self.finish_analysis()
+                    self.status_label.config(text="Analysis cancelled.")
+                    return
+
+                elif kind == "error":
+                    self.failed_run = self.current_run
+                    self.finish_analysis()
+                    title, error_msg = payload
+                    messagebox.showerror(title, error_msg)
+                    self.status_label.config(text="")
+                    return
+
+        except queue.Empty:
+            pass
+
+        self.root.after(100, self.poll_worker)
+
+    def cancel_analysis(self):
+        if self.worker is not None and self.worker.is_alive():
+            self.worker.cancel()
+            self.cancel_button.config(state="disabled")
+            self.status_label.config(text="Cancelling after the current step...")
+
+    def finish_analysis(self):
+        # Re-enable the button regardless of success or error
+        self.cancel_button.grid_remove()
+        self.analyse_button.config(state="normal", bg='white', fg='green')
 
     def find_and_open_twbx(self):
         # Define the target file name
@@ -282,17 +325,73 @@ class SentiMemeApp:
             self.analyse_button.config(state="normal", bg='white', fg='green')
             self.status_label.config(text="")
 
+    def start_coin_list_refresh(self):
+        threading.Thread(target=self.refresh_coin_list, name="coin-list-refresh", daemon=True).start()
+        self.root.after(200, self.poll_coin_updates)
+
+    def refresh_coin_list(self):
+        """Background thread: indexes the snapshot, then refreshes the coin list if it is stale."""
+        from scripts.coin_search_index import CoinSearchIndex
+        if self.coin_generator.get_coins():
+            self.coin_updates.put(("index", CoinSearchIndex(self.coin_generator.get_coins())))
+        try:
+            changed = self.coin_generator.refresh()
+        except RuntimeError as e:
+            # Offline: keep using the snapshot, if there is one
+            self.coin_updates.put(("error", str(e)))
+            return
+        if changed:
+            self.coin_updates.put(("index", CoinSearchIndex(self.coin_generator.get_coins())))
+        self.coin_updates.put(("done", None))
+
+    def poll_coin_updates(self):
+        """Swaps in new search indexes on the Tk main thread."""
+        try:
+            while True:
+                kind, payload = self.coin_updates.get_nowait()
+
+                if kind == "index":
+                    self.coin_index = payload
+                    self.coinlist = self.coin_generator.get_list()
+                    if self.root.focus_get() == self.ticker_entry:
+                        self.refresh_dropdown()
+
+                elif kind == "error":
+                    if self.coin_index is None:
+                        messagebox.showerror("Unexpected Error",
+                                             f"{payload}\nPlease connect to the internet and restart.")
+                    return
+
+                elif kind == "done":
+                    return
+
+        except queue.Empty:
+            pass
+
+        self.root.after(200, self.poll_coin_updates)
+
     def update_dropdown(self, event=None):
+        # Debounce: only search once typing pauses
+        if self.dropdown_job is not None:
+            self.root.after_cancel(self.dropdown_job)
+        self.dropdown_job = self.root.after(DROPDOWN_DEBOUNCE_MS, self.refresh_dropdown)
+
+    def refresh_dropdown(self):
+        self.dropdown_job = None
         self.dropdown_listbox.delete(0, tk.END)
-        prefix = self.ticker_var.get().lower()
-        filtered_tickers = [coin for coin in self.coinlist if prefix in coin.lower()]
-        for coin in filtered_tickers:
-            self.dropdown_listbox.insert(tk.END, coin)
-        if self.dropdown_listbox.size() > 0:
+        if self.coin_index is None:
+            # Still indexing the coin list
+            self.dropdown_window.withdraw()
+            return
+        filtered_tickers = self.coin_index.search(self.ticker_var.get(), limit=DROPDOWN_MAX_RESULTS)
+        if filtered_tickers:
+            self.dropdown_listbox.insert(tk.END, *filtered_tickers)
             x = self.ticker_entry.winfo_rootx()
             y = self.ticker_entry.winfo_rooty() + self.ticker_entry.winfo_height()
             self.dropdown_window.geometry(f"+{x}+{y}")
             self.dropdown_window.deiconify()
+        else:
+            self.dropdown_window.withdraw()
 
     def hide_dropdown(self, event=None):
         if event and hasattr(event, 'widget'):
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks: synthetic fixtures, fake API transports, tiny models and the
+stage runner (python -m benchmarks.run).
+"""
@@ -0,0 +1,129 @@
+import contextlib
+import json
+import time
+from urllib.parse import parse_qs, urlparse
+from benchmarks.synthetic import make_coin_list, make_market_chart
+from scripts import http_client
+
+"""
+Local stand-in transports so the pipeline runs without network access:
+
+    FakeCoingeckoClient  - replaces the shared rate-limited CoinGecko client; answers
+                           /coins/list and /market_chart/range from the synthetic generators
+    FakeReddit           - a PRAW-like object serving a synthetic listing and comments
+
+(benchmarks.offline_reddit wires FakeReddit into RedditAPI.) Both can add a fixed per-request latency to imitate network round trips.
+"""
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+    @property
+    def text(self):
+        return json.dumps(self.payload)
+
+
+class FakeCoingeckoClient:
+    def __init__(self, latency_seconds=0.0, n_coins=15000):
+        self.latency_seconds = latency_seconds
+        self.n_coins = n_coins
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "throttle_wait_seconds": 0.0}
+
+    def get_counters(self):
+        return dict(self.counters)
+
+    def get(self, url, headers=None):
+        self.counters["requests"] += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        parsed = urlparse(url)
+        if parsed.path.endswith("/coins/list"):
+            return FakeResponse(make_coin_list(self.n_coins), headers={"ETag": '"synthetic"'})
+        if parsed.path.endswith("/market_chart/range"):
+            query = parse_qs(parsed.query)
+            coin = parsed.path.split("/")[-3]
+            # Same coin, same prices: seed from the coin id
+            seed = sum(coin.encode("utf-8"))
+            return FakeResponse(make_market_chart(float(query["from"][0]), float(query["to"][0]), seed=seed))
+        return FakeResponse({"error": "not found"}, status_code=404)
+
+
+@contextlib.contextmanager
+def fake_coingecko(client=None):
+    """Routes every CoingeckoFetchAPI request to `client` (a FakeCoingeckoClient) inside the block."""
+    client = client or FakeCoingeckoClient()
+    previous = http_client._coingecko_client
+    http_client._coingecko_client = client
+    try:
+        yield client
+    finally:
+        http_client._coingecko_client = previous
+
+
+class Attributes:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class FakeComments(list):
+    def replace_more(self, limit=0):
+        return []
+
+
+class FakeSubreddit:
+    def __init__(self, reddit, name):
+        self.reddit = reddit
+        self.display_name = name
+
+    def new(self, limit=100, params=None):
+        """Newest-first listing, resumable with params={"after": fullname} like PRAW."""
+        posts = self.reddit.listing
+        start = 0
+        after = (params or {}).get("after")
+        if after:
+            start = next((i + 1 for i, post in enumerate(posts) if f"t3_{post['id']}" == after), len(posts))
+        for i, post in enumerate(posts[start:start + limit]):
+            if i % self.reddit.page_size == 0:
+                self.reddit.request()
+            yield Attributes(fullname=f"t3_{post['id']}", **{k: v for k, v in post.items() if k != "comments"})
+
+
+class FakeReddit:
+    def __init__(self, listing, latency_seconds=0.0, page_size=100):
+        """
+        :param listing: Posts from benchmarks.synthetic.make_listing (newest first).
+        :param latency_seconds: Delay per request (one per listing page, info batch or submission).
+        """
+        self.listing = listing
+        self.page_size = page_size
+        self.by_id = {post["id"]: post for post in listing}
+        self.latency_seconds = latency_seconds
+        self.requests = 0
+
+    def request(self):
+        self.requests += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def subreddit(self, name):
+        return FakeSubreddit(self, name)
+
+    def info(self, fullnames):
+        """Current attributes of the given posts, one request per call like /api/info."""
+        self.request()
+        for fullname in fullnames:
+            post = self.by_id[fullname[len("t3_"):]]
+            yield Attributes(fullname=fullname, **{k: v for k, v in post.items() if k != "comments"})
+
+    def submission(self, id):
+        self.request()
+        post = self.by_id[id]
+        return Attributes(id=id, comments=FakeComments(Attributes(body=body) for body in post["comments"]))
+
@@ -0,0 +1,15 @@
+from scripts.reddit_api_fetch import RedditAPI
+
+"""
+RedditAPI over a benchmarks.fakes.FakeReddit instead of an authenticated PRAW
+instance. Kept apart from the fakes so the other stages run without praw installed.
+"""
+class OfflineRedditAPI(RedditAPI):
+    COMMENT_REQUESTS_PER_MINUTE = 1_000_000  # the fake transport has no rate limit
+
+    def __init__(self, fake_reddit, *args, **kwargs):
+        self.fake_reddit = fake_reddit
+        super().__init__(*args, **kwargs)
+
+    def create_reddit_instance(self):
+        return self.fake_reddit
@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from scripts.model_registry import current_rss_bytes
+
+"""
+Offline benchmark of the pipeline stages on synthetic data.
+
+Every stage runs in a fresh temporary working directory (cold caches) against
+the fake CoinGecko/Reddit transports and, for topic and sentiment, the tiny
+models. Fixtures are built before the clock starts. Per stage and size it reports:
+
+    seconds         best wall time over --repeat runs
+    rows_per_sec    rows processed per second (posts, or price samples)
+    peak_mb         peak Python/numpy allocation (tracemalloc, measured in a separate run)
+    rss_delta_mb    growth of the process RSS over that run
+
+    python -m benchmarks.run --sizes 1000,10000
+    python -m benchmarks.run --save-baseline             # store results in benchmarks/baselines.json
+    python -m benchmarks.run --baseline benchmarks/baselines.json --tolerance 0.25
+
+With a baseline, a stage/size is flagged when its throughput drops or its peak
+memory grows by more than the tolerance, and the exit code is 1. Baselines are
+machine-specific: record them on the machine that compares against them.
+"""
+END = datetime(2025, 1, 31, tzinfo=timezone.utc)
+WINDOW_DAYS = 15
+STAGES = ("numeric", "features", "reddit", "topic", "sentiment", "export")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# Memory growth below this is noise, whatever the tolerance
+MIN_MEMORY_DELTA_MB = 5
+
+
+def setup_numeric(size):
+    """`size` hourly price samples fetched through MarketDataCache from the fake CoinGecko."""
+    from benchmarks.fakes import fake_coingecko
+    from scripts.Numeric_Analysis_Subsystem import NumericSubsystem
+
+    def run():
+        with fake_coingecko():
+            numeric = NumericSubsystem(END - timedelta(hours=size), END, "dogecoin")
+            numeric.extract_data()
+            numeric.convert_df()
+        return len(numeric.get_numeric_data_df())
+    return run
+
+
+def numeric_frame(hours):
+    from benchmarks.synthetic import make_market_chart
+    from scripts.Numeric_Analysis_Subsystem import NumericSubsystem
+
+    numeric = NumericSubsystem(END - timedelta(hours=hours), END, "dogecoin")
+    numeric.market_data = make_market_chart(numeric.start, numeric.end)
+    numeric.convert_df()
+    return numeric.get_numeric_data_df()
+
+
+def setup_features(size):
+    from scripts.market_features import MarketFeatureEngine
+
+    df = numeric_frame(size)
+    return lambda: len(MarketFeatureEngine().add_features(df))
+
+
+def setup_reddit(size):
+    """Sync of `size` listing posts into a fresh store, keyword match and comment hydration."""
+    from benchmarks.fakes import FakeReddit
+    from benchmarks.offline_reddit import OfflineRedditAPI
+    from benchmarks.synthetic import make_listing
+
+    listing = make_listing(size, end=END, days=WINDOW_DAYS)
+
+    def run():
+        api = OfflineRedditAPI(FakeReddit(listing), "synthetic", ["doge"], END - timedelta(days=WINDOW_DAYS), END)
+        try:
+            return len(api.search_subreddit())
+        finally:
+            api.store.close()
+    return run
+
+
+def setup_topic(size):
+    from benchmarks.synthetic import make_reddit_posts
+    from benchmarks.tiny_models import TINY_EMBEDDING_MODEL, use_tiny_models
+    from scripts.topic_model import RedditTopicModel
+
+    use_tiny_models()
+    topic_model = RedditTopicModel(make_reddit_posts(size, end=END, days=WINDOW_DAYS), model_name=TINY_EMBEDDING_MODEL)
+    topic_model.initialize_model()
+
+    def run():
+        topic_model.fit_transform()
+        return len(topic_model.df)
+    return run
+
+
+def setup_sentiment(size):
+    from benchmarks.synthetic import make_reddit_posts
+    from benchmarks.tiny_models import TINY_SENTIMENT_MODEL, use_tiny_models
+    from scripts.sentiment_analysis import RedditSentimentAnalysis
+
+    use_tiny_models()
+    sentiment = RedditSentimentAnalysis(make_reddit_posts(size, end=END, days=WINDOW_DAYS),
+                                        model_name=TINY_SENTIMENT_MODEL)
+    sentiment.initialize_model()
+
+    def run():
+        sentiment.analyze_sentiment()
+        return len(sentiment.df)
+    return run
+
+
+def setup_export(size):
+    """Asof join of `size` scored posts against the hourly prices of the window, written to CSV."""
+    from benchmarks.synthetic import make_reddit_posts, make_sentiment_frame
+    from scripts.export_csv import ExportCSV
+
+    df_text = make_sentiment_frame(make_reddit_posts(size, end=END, days=WINDOW_DAYS))
+    df_num = numeric_frame(WINDOW_DAYS * 24)
+
+    def run():
+        return len(ExportCSV(df_text, df_num, "merged_exported_data.csv", join="asof",
+                             price_horizons=["1h", "24h"]).df)
+    return run
+
+
+SETUPS = {
+    "numeric": setup_numeric,
+    "features": setup_features,
+    "reddit": setup_reddit,
+    "topic": setup_topic,
+    "sentiment": setup_sentiment,
+    "export": setup_export,
+}
+
+
+@contextlib.contextmanager
+def scratch_directory():
+    """Runs the block in an empty temporary working directory, so every stage starts with cold caches."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="sentimeme-bench-") as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(previous)
+
+
+def measure(stage, size, repeat=3):
+    """
+    Benchmarks one stage at one size.
+    :return: Result dict, with "skipped" set instead of the measurements when a dependency is missing.
+    """
+    result = {"stage": stage, "size": size}
+    timings = []
+    try:
+        for _ in range(repeat):
+            with scratch_directory():
+                run = SETUPS[stage](size)
+                start = time.perf_counter()
+                rows = run()
+                timings.append(time.perf_counter() - start)
+
+        with scratch_directory():
+            run = SETUPS[stage](size)
+            rss_before = current_rss_bytes()
+            tracemalloc.start()
+            try:
+                run()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            rss_after = current_rss_bytes()
+    except ImportError as e:
+        result["skipped"] = f"missing {e.name or e}"
+        return result
+
+    seconds = min(timings)
+    result.update({
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+        "peak_mb": round(peak / 2 ** 20, 1),
+        "rss_delta_mb": round((rss_after - rss_before) / 2 ** 20, 1) if rss_before and rss_after else None,
+    })
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Marks each result with its baseline and the regressions found. :return: Number of regressions."""
+    regressions = 0
+    for result in results:
+        reference = baseline.get("results", {}).get(result["stage"], {}).get(str(result["size"]))
+        if reference is None or "skipped" in result:
+            continue
+        problems = []
+        if reference.get("rows_per_sec") and result["rows_per_sec"] is not None \
+                and result["rows_per_sec"] < reference["rows_per_sec"] * (1 - tolerance):
+            problems.append(f"throughput {result['rows_per_sec']:.0f} < {reference['rows_per_sec']:.0f} rows/s")
+        if reference.get("peak_mb") is not None and result["peak_mb"] > reference["peak_mb"] * (1 + tolerance) \
+                and result["peak_mb"] - reference["peak_mb"] > MIN_MEMORY_DELTA_MB:
+            problems.append(f"peak memory {result['peak_mb']:.0f} > {reference['peak_mb']:.0f} MB")
+        result["baseline"] = reference
+        result["regressions"] = problems
+        regressions += bool(problems)
+    return regressions
+
+
+def format_results(results):
+    lines = [f"{'stage':<10} {'size':>8} {'rows':>8} {'seconds':>9} {'rows/s':>11} {'peak MB':>8} "
+             f"{'RSS +MB':>8} {'vs base':>8}  status"]
+    for result in results:
+        if "skipped" in result:
+            lines.append(f"{result['stage']:<10} {result['size']:>8} {'':>8} {'':>9} {'':>11} {'':>8} {'':>8} "
+                         f"{'':>8}  skipped ({result['skipped']})")
+            continue
+        reference = result.get("baseline")
+        change = f"{result['rows_per_sec'] / reference['rows_per_sec'] - 1:+.0%}" \
+            if reference and reference.get("rows_per_sec") and result["rows_per_sec"] else "-"
+        rss = f"{result['rss_delta_mb']:.1f}" if result["rss_delta_mb"] is not None else "-"
+        status = "REGRESSION: " + "; ".join(result["regressions"]) if result.get("regressions") else "ok"
+        lines.append(f"{result['stage']:<10} {result['size']:>8} {result['rows']:>8} {result['seconds']:>9.3f} "
+                     f"{result['rows_per_sec'] or 0:>11.0f} {result['peak_mb']:>8.1f} {rss:>8} {change:>8}  {status}")
+    return "\n".join(lines)
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        logging.warning(f"No baseline at {path}; nothing to compare against")
+        return {}
+    except ValueError as e:
+        raise RuntimeError(f"Unreadable baseline {path}: {e}") from e
+
+
+def save_baseline(path, results, existing=None):
+    """Writes the measured results into the baseline file, keeping entries for stages/sizes not rerun."""
+    baseline = existing or {}
+    baseline["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                           "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()}
+    baseline["recorded_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    stored = baseline.setdefault("results", {})
+    for result in results:
+        if "skipped" not in result:
+            stored.setdefault(result["stage"], {})[str(result["size"])] = {
+                key: result[key] for key in ("rows", "seconds", "rows_per_sec", "peak_mb", "rss_delta_mb")}
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages offline on synthetic data.")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="Comma-separated sizes: posts for reddit/topic/sentiment/export, hourly samples "
+                             "for numeric/features")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage and size (the best is kept)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative throughput drop / peak memory growth before flagging")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in SETUPS]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    results = [measure(stage, size, args.repeat) for stage in stages for size in sizes]
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) or not args.save_baseline else {}
+    regressions = compare(results, baseline, args.tolerance)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.save_baseline:
+        save_baseline(args.baseline, results, baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%} of the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
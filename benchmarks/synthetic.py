@@ -0,0 +1,123 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+
+"""
+Synthetic fixtures shaped like the real API data:
+
+    make_reddit_posts()   - posts as RedditAPI.search_subreddit returns them
+    make_listing()        - the same posts as raw listing items (for the fake PRAW transport)
+    make_market_chart()   - a CoinGecko market_chart payload (random-walk prices)
+
+Everything is seeded, so the same size always produces the same data.
+"""
+SGT = timezone(timedelta(hours=8))
+
+COIN_WORDS = ["doge", "dogecoin", "btc", "bitcoin", "eth", "ethereum", "sol", "pepe", "shib", "coin"]
+MARKET_WORDS = ["moon", "pump", "dump", "hodl", "buy", "sell", "dip", "rally", "bear", "bull", "whale",
+                "chart", "breakout", "support", "resistance", "volume", "fomo", "rekt", "gains", "loss"]
+FILLER_WORDS = ["the", "is", "going", "to", "this", "week", "i", "think", "we", "are", "so", "back",
+                "just", "bought", "more", "never", "selling", "again", "what", "happened", "today",
+                "lol", "honestly", "looks", "like", "another", "great", "terrible", "day", "for"]
+VOCABULARY = COIN_WORDS + MARKET_WORDS + FILLER_WORDS
+
+
+def sentence(rng, words=12, coin=None):
+    tokens = [rng.choice(FILLER_WORDS if rng.random() < 0.6 else MARKET_WORDS) for _ in range(words)]
+    if coin:
+        tokens.insert(rng.randrange(len(tokens) + 1), coin)
+    return " ".join(tokens)
+
+
+def make_listing(n_posts, end=None, days=15, comments_per_post=5, match_ratio=0.5, coin="doge", seed=0):
+    """
+    Raw posts, newest first, spread evenly over `days` before `end`.
+    :param match_ratio: Share of posts whose title mentions `coin`.
+    :return: List of dicts with the PRAW submission attributes plus a "comments" list.
+    """
+    rng = random.Random(seed)
+    end = end or datetime(2025, 1, 31, tzinfo=timezone.utc)
+    end_utc = end.timestamp()
+    spacing = days * 86400 / max(n_posts, 1)
+    posts = []
+    for i in range(n_posts):
+        ups = int(rng.expovariate(1 / 50))
+        posts.append({
+            "id": f"p{seed}_{i:07d}",
+            "title": sentence(rng, rng.randint(5, 14), coin if rng.random() < match_ratio else None),
+            "selftext": sentence(rng, rng.randint(0, 40)) if rng.random() < 0.4 else "",
+            "created_utc": float(int(end_utc - i * spacing - rng.random() * spacing)),  # whole seconds, like Reddit
+            "upvote_ratio": round(rng.uniform(0.5, 1.0), 2),
+            "ups": ups,
+            "downs": 0,
+            "score": ups,
+            "permalink": f"/r/synthetic/comments/p{seed}_{i:07d}/",
+            "comments": [sentence(rng, rng.randint(3, 60)) for _ in range(comments_per_post)],
+        })
+    return posts
+
+
+def make_reddit_posts(n_posts, **kwargs):
+    """A DataFrame with the columns of RedditAPI.search_subreddit's output."""
+    rows = [{
+        "id": post["id"],
+        "title": post["title"],
+        "selftext": post["selftext"],
+        "created": datetime.fromtimestamp(post["created_utc"], tz=timezone.utc).astimezone(SGT),
+        "upvote_ratio": post["upvote_ratio"],
+        "ups": post["ups"],
+        "downs": post["downs"],
+        "score": post["score"],
+        "comments": post["comments"],
+        "url": f"https://www.reddit.com{post['permalink']}",
+    } for post in make_listing(n_posts, **kwargs)]
+    return pd.DataFrame(rows)
+
+
+def make_sentiment_frame(posts_df, seed=0):
+    """Posts with topic and sentiment columns, as RedditSentimentAnalysis returns them."""
+    rng = np.random.default_rng(seed)
+    probabilities = rng.dirichlet([1, 1, 1], size=len(posts_df))
+    df = posts_df.copy()
+    df["topic"] = rng.integers(0, 8, size=len(df))
+    df["sentiment"] = np.array(["Negative", "Neutral", "Positive"])[probabilities.argmax(axis=1)]
+    df["p_neg"], df["p_neut"], df["p_pos"] = probabilities.T
+    df["Date"] = pd.to_datetime(df["created"]).dt.date.astype(str)
+    df["Time"] = pd.to_datetime(df["created"]).dt.time.astype(str)
+    return df[["id", "title", "created", "Date", "Time", "upvote_ratio", "topic", "sentiment",
+               "p_neg", "p_neut", "p_pos", "url"]]
+
+
+def make_market_chart(start, end, interval_seconds=3600, start_price=0.1, volatility=0.01, seed=0):
+    """
+    A market_chart payload for [start, end] (unix seconds):
+    {"prices": [[ms, value], ...], "market_caps": ..., "total_volumes": ...}.
+    Sample times are aligned to the interval, with CoinGecko-like millisecond jitter.
+    """
+    rng = np.random.default_rng(seed)
+    first = math.ceil(start / interval_seconds) * interval_seconds
+    times = np.arange(first, end + 1, interval_seconds, dtype=np.int64)
+    if len(times) == 0:
+        return {"prices": [], "market_caps": [], "total_volumes": []}
+    timestamps = times * 1000 + rng.integers(0, 5000, size=len(times))
+    prices = start_price * np.exp(np.cumsum(rng.normal(0, volatility, size=len(times))))
+    market_caps = prices * 1.4e11
+    volumes = np.abs(rng.normal(1e9, 2e8, size=len(times)))
+    return {
+        "prices": [[int(t), round(float(p), 8)] for t, p in zip(timestamps, prices)],
+        "market_caps": [[int(t), float(m)] for t, m in zip(timestamps, market_caps)],
+        "total_volumes": [[int(t), float(v)] for t, v in zip(timestamps, volumes)],
+    }
+
+
+def make_coin_list(n_coins=15000, seed=0):
+    """A /coins/list payload of [{"id", "symbol", "name"}, ...]."""
+    rng = random.Random(seed)
+    coins = [{"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+             {"id": "dogecoin", "symbol": "doge", "name": "Dogecoin"}]
+    for i in range(n_coins - len(coins)):
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+        coins.append({"id": f"{word}-{i}", "symbol": word[:rng.randint(2, 5)], "name": word.title()})
+    return coins
@@ -0,0 +1,75 @@
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from benchmarks.synthetic import VOCABULARY
+from scripts.model_registry import ModelRegistry
+
+try:
+    from bertopic.backend import BaseEmbedder
+except ImportError:
+    BaseEmbedder = object
+
+"""
+Tiny stand-ins for the embedding and sentiment models, so the topic and
+sentiment stages can be benchmarked in seconds and without downloads:
+
+    TinyEmbedder          - hashed bag-of-words vectors (SentenceTransformer-style encode())
+    tiny sentiment model  - a 2-layer, 32-wide randomly initialised BERT classifier with a
+                            word-level tokenizer over the synthetic vocabulary
+
+use_tiny_models() registers both with the shared ModelRegistry under
+TINY_EMBEDDING_MODEL / TINY_SENTIMENT_MODEL. Their outputs are meaningless;
+only the shape of the work (tokenize, batch, infer, cluster) matches the real models.
+"""
+TINY_EMBEDDING_MODEL = "tiny-embedding"
+TINY_SENTIMENT_MODEL = "tiny-sentiment"
+
+
+class TinyEmbedder(BaseEmbedder):
+    def __init__(self, dim=64):
+        super().__init__()
+        self.vectorizer = HashingVectorizer(n_features=dim, alternate_sign=False, norm="l2")
+
+    def encode(self, texts, batch_size=64, show_progress_bar=False):
+        return self.vectorizer.transform(list(texts)).toarray().astype(np.float32)
+
+    # BERTopic's embedder interface
+    def embed(self, documents, verbose=False):
+        return self.encode(documents)
+
+
+def load_tiny_embedding_model(model_name):
+    return TinyEmbedder()
+
+
+def load_tiny_sentiment_model(model_name):
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import BertConfig, BertForSequenceClassification, PreTrainedTokenizerFast
+
+    special = ["[PAD]", "[UNK]", "[CLS]", "[SEP]"]
+    vocab = {token: i for i, token in enumerate(special + sorted(set(VOCABULARY)))}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    backend.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, pad_token="[PAD]", unk_token="[UNK]",
+                                        cls_token="[CLS]", sep_token="[SEP]", model_max_length=512)
+
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=512, num_labels=3)
+    return tokenizer, BertForSequenceClassification(config)
+
+
+def use_tiny_models(registry=None):
+    """
+    Makes the registry load the tiny models for the tiny model names; every other
+    name still goes to the real loader.
+    """
+    registry = registry or ModelRegistry.shared()
+    for kind, tiny_name, tiny_loader in (("embedding", TINY_EMBEDDING_MODEL, load_tiny_embedding_model),
+                                         ("sentiment", TINY_SENTIMENT_MODEL, load_tiny_sentiment_model)):
+        real_loader = registry.loaders[kind]
+        registry.register_loader(kind, lambda name, tiny_name=tiny_name, tiny_loader=tiny_loader,
+                                 real_loader=real_loader: (tiny_loader if name == tiny_name else real_loader)(name))
+    return registry
@@ -1,7 +1,9 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from tzlocal import get_localzone
-from scripts.coingecko_api_fetch import CoingeckoFetchAPI
+from scripts.market_data_cache import MarketDataCache
+from scripts.market_features import MarketFeatureEngine
 import logging
 
 """
@@ -34,6 +36,10 @@ class NumericSubsystem:
             df = pd.DataFrame(response['prices'])
             df = df.rename(columns={1: 'Price'})
             df = df.rename(columns={0: 'Timestamp'})
+            # Market caps and volumes share the price timestamps
+            for key, column in (('market_caps', 'Market Cap'), ('total_volumes', 'Total Volume')):
+                series = pd.DataFrame(response.get(key) or [], columns=['Timestamp', column])
+                df = df.merge(series.drop_duplicates('Timestamp'), on='Timestamp', how='left')
             local_tz = get_localzone()  # Detect OS timezone
             df["Timestamp"] = pd.to_datetime(df["Timestamp"], unit="ms")  # Convert Unix timestamp
             df["Timestamp"] = df["Timestamp"].dt.tz_localize("UTC").dt.tz_convert(local_tz)
@@ -49,36 +55,46 @@ class NumericSubsystem:
     """
     def extract_date_time(self, df):
         try:
-            df["Timestamp"] = df["Timestamp"].astype(str)
-            time_col = df["Timestamp"].str.split(".").str.get(0)
-            date_col = time_col.str.split(" ").str.get(0)
-            time_col = time_col.str.split(" ").str.get(1)
-            time_col = time_col.str.split("+").str.get(0)
-            df.insert(1, "Date", date_col)
-            df.insert(2, "Time", time_col)
+            # Timestamp stays a datetime; Date and Time are formatted in one vectorised pass
+            local_time = df["Timestamp"].dt.tz_localize(None).to_numpy(dtype="datetime64[s]")
+            formatted = pd.Series(np.datetime_as_string(local_time, unit="s"), index=df.index)
+            df.insert(1, "Date", formatted.str.slice(0, 10))
+            df.insert(2, "Time", formatted.str.slice(11, 19))
             return df
 
         except Exception as e:
             logging.error(f"Error extracting date,time from timestamp")
             raise RuntimeError("Numeric Subsystem error") from e
 
+    def get_market_features(self, engine=None):
+        """Numeric data with log returns, volatility and volume features (see MarketFeatureEngine)."""
+        return (engine or MarketFeatureEngine()).add_features(self.get_numeric_data_df())
+
+    def get_ohlc(self, interval="1D"):
+        return MarketFeatureEngine.ohlc(self.get_numeric_data_df(), interval)
+
     # Converts response into dataframe
     def convert_df(self):
         try:
-            self.numeric_data_df = self.response.json()
+            self.numeric_data_df = self.market_data
             self.transform_numbers()
             numeric_df = self.numeric_data_df
-            numeric_df.pipe(self.extract_date_time)
+            numeric_df = numeric_df.pipe(self.extract_date_time)
             self.numeric_data_df = numeric_df
 
         except Exception as e:
             logging.error(f"Error converting DF from CoinGecko API result")
             raise RuntimeError("The coin may not be active anymore") from e
 
-    # Call CoingeckoAPI
+    # Call CoingeckoAPI, only for the parts of the window not already cached on disk.
+    # Windows the planner splits into several requests are stitched onto an even hourly grid;
+    # shorter ones are kept exactly as CoinGecko returned them.
     def extract_data(self):
         try:
-            self.response = CoingeckoFetchAPI.for_market_data(self.start, self.end, self.coin_name).retrieve_response()
+            market_data_cache = MarketDataCache()
+            interval_seconds = 3600 if len(market_data_cache.planner.plan(self.start, self.end)) > 1 else None
+            self.market_data = market_data_cache.get_market_data(self.start, self.end, self.coin_name,
+                                                                 interval_seconds=interval_seconds)
 
         except Exception as e:
             logging.error(f"Coingecko Input Error: {e}")
@@ -0,0 +1,69 @@
+import logging
+import queue
+import threading
+import time
+from scripts.pipeline import AnalysisCancelled
+
+"""
+AnalysisWorker runs an AnalysisPipeline off the Tk main thread.
+All communication back to the GUI goes through a thread-safe queue
+of (kind, payload) messages, where kind is one of:
+    "progress"  - payload is a status string
+    "done"      - payload is the list of pipeline warnings
+    "cancelled" - payload is None
+    "error"     - payload is (title, message)
+"""
+class AnalysisWorker(threading.Thread):
+    PROGRESS_INTERVAL = 0.2  # seconds between progress messages per stage
+
+    def __init__(self, pipeline, messages=None):
+        super().__init__(daemon=True)
+        self.pipeline = pipeline
+        self.messages = messages if messages is not None else queue.Queue()
+        self.cancel_event = threading.Event()
+
+        self.pipeline.progress_callback = self.report_progress
+        self.pipeline.cancel_event = self.cancel_event
+
+        self.current_stage = None
+        self.stage_started = None
+        self.last_report = 0.0
+
+    def run(self):
+        try:
+            self.pipeline.run()
+            self.messages.put(("done", list(self.pipeline.warnings)))
+        except AnalysisCancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as e:
+            logging.error(f"Unexpected error: {e}")
+            self.messages.put(("error", ("Unexpected Error", f"Unexpected error: {e}")))
+
+    def cancel(self):
+        """Requests cancellation. The pipeline stops at its next checkpoint."""
+        self.cancel_event.set()
+
+    def report_progress(self, stage, done, total=None, detail=""):
+        now = time.monotonic()
+        if stage != self.current_stage:
+            self.current_stage = stage
+            self.stage_started = now
+            self.last_report = 0.0
+
+        finished = total is not None and done >= total
+        if not finished and done and now - self.last_report < self.PROGRESS_INTERVAL:
+            return
+        self.last_report = now
+        self.messages.put(("progress", self.format_progress(stage, done, total, detail, now)))
+
+    def format_progress(self, stage, done, total, detail, now):
+        text = f"Running {stage}..."
+        if total:
+            text = f"Running {stage}: {done}/{total}"
+            elapsed = now - self.stage_started
+            if 0 < done < total and elapsed > 0:
+                eta = elapsed / done * (total - done)
+                text += f" (ETA {int(eta // 60)}m {int(eta % 60):02d}s)"
+        if detail:
+            text += f" - {detail}"
+        return text
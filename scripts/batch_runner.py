@@ -0,0 +1,246 @@
+import argparse
+import csv
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from scripts.pipeline import AnalysisPipeline
+from scripts.model_registry import ModelRegistry
+
+"""
+Headless batch runner. Runs the analysis pipeline for every job in a
+job file without the GUI. Models come from the process-wide ModelRegistry,
+so they are loaded once and shared between jobs.
+
+Job file (CSV) columns:
+    coin_id, subreddit, window_days
+e.g.
+    coin_id,subreddit,window_days
+    bitcoin,CryptoCurrency,15
+    dogecoin,dogecoin,7
+"""
+
+
+class BatchRunner:
+    def __init__(self, jobs, output_dir="batch_output", end_datetime=None, batch_size=64, max_tokens=4096,
+                 sentiment_backend="pytorch", check_parity=False, topic_mode="full", export_join="date",
+                 price_horizons=None, store_dir=None, market_features=False, streaming=False):
+        """
+        :param jobs: List of dicts with coin_id, subreddit and window_days.
+        :param output_dir: Directory that receives one sub-folder per job.
+        :param end_datetime: Window end shared by all jobs (default: now).
+        :param streaming: Score sentiment while each job's posts are still being fetched.
+        """
+        self.jobs = jobs
+        self.output_dir = output_dir
+        self.end_datetime = end_datetime or datetime.now()
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.sentiment_backend = sentiment_backend
+        self.check_parity = check_parity
+        self.topic_mode = topic_mode
+        self.export_join = export_join
+        self.price_horizons = price_horizons
+        self.store_dir = store_dir
+        self.market_features = market_features
+        self.streaming = streaming
+        self.models = ModelRegistry.shared()
+        self.results = []
+        self.coin_generator = None
+        self.coin_list_failed = False
+
+    @classmethod
+    def from_job_file(cls, path, **kwargs):
+        return cls(cls.read_job_file(path), **kwargs)
+
+    @staticmethod
+    def read_job_file(path):
+        jobs = []
+        try:
+            with open(path, newline="") as job_file:
+                for line_no, row in enumerate(csv.DictReader(job_file), start=2):
+                    coin_id = (row.get("coin_id") or "").strip()
+                    subreddit = (row.get("subreddit") or "").strip()
+                    if subreddit.startswith("r/"):
+                        subreddit = subreddit[2:]
+                    if not coin_id or not subreddit:
+                        logging.warning(f"Skipping incomplete job on line {line_no}: {row}")
+                        continue
+                    jobs.append({
+                        "coin_id": coin_id,
+                        "subreddit": subreddit,
+                        "window_days": float(row.get("window_days") or 15),
+                    })
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read job file {path}: {e}")
+            raise RuntimeError(f"Failed to read job file {path}.") from e
+        return jobs
+
+    def run(self):
+        """Runs every job in order. A failing job is recorded and does not stop the batch."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        batch_start = time.perf_counter()
+        # Load models in the background while the first job fetches its data
+        self.models.warm_up()
+
+        for index, job in enumerate(self.jobs, start=1):
+            logging.info(f"Batch job {index}/{len(self.jobs)}: {job['coin_id']} in r/{job['subreddit']}")
+            # Jobs on the same coin and subreddit may differ only in their window
+            job_dir = os.path.join(self.output_dir,
+                                   f"{job['coin_id']}__{job['subreddit']}__{job['window_days']:g}d")
+            os.makedirs(job_dir, exist_ok=True)
+
+            pipeline = AnalysisPipeline(
+                job["coin_id"],
+                job["subreddit"],
+                self.end_datetime - timedelta(days=job["window_days"]),
+                self.end_datetime,
+                keywords=self.coin_aliases(job["coin_id"]),
+                output_path=os.path.join(job_dir, "merged_exported_data.csv"),
+                batch_size=self.batch_size,
+                max_tokens=self.max_tokens,
+                sentiment_backend=self.sentiment_backend,
+                check_parity=self.check_parity,
+                topic_mode=self.topic_mode,
+                export_join=self.export_join,
+                price_horizons=self.price_horizons,
+                store_dir=self.store_dir,
+                market_features=self.market_features,
+                streaming=self.streaming,
+                trace_dir=os.path.join(self.output_dir, "traces"),
+            )
+            result = dict(job, status="ok", error="")
+            try:
+                pipeline.run()
+            except Exception as e:
+                logging.error(f"Batch job {job['coin_id']}/{job['subreddit']} failed: {e}")
+                result.update(status="failed", error=str(e))
+            result["stages"] = pipeline.stage_timings
+            result["warnings"] = pipeline.warnings
+            result["parity"] = pipeline.parity_report
+            self.results.append(result)
+
+        self.total_seconds = time.perf_counter() - batch_start
+        self.write_summary()
+        return self.results
+
+    def coin_aliases(self, coin_id):
+        """Id, symbol and name of the coin, so Reddit is searched for all of them at once."""
+        if self.coin_generator is None and not self.coin_list_failed:
+            try:
+                from scripts.coin_list_generator import CoinListGenerator
+                self.coin_generator = CoinListGenerator()
+            except Exception as e:
+                logging.warning(f"Coin list unavailable, searching Reddit by coin id only: {e}")
+                self.coin_list_failed = True
+        if self.coin_generator is None:
+            return [coin_id]
+        return self.coin_generator.get_aliases(coin_id)
+
+    def stage_summary(self):
+        """Aggregates wall time, rows and throughput per stage across all jobs."""
+        summary = {}
+        for stage in AnalysisPipeline.STAGES:
+            runs = [r["stages"][stage] for r in self.results if stage in r["stages"]]
+            seconds = sum(run["seconds"] for run in runs)
+            rows = sum(run["rows"] for run in runs)
+            summary[stage] = {
+                "jobs": len(runs),
+                "cached": sum(1 for run in runs if run.get("cached")),
+                "seconds": seconds,
+                "rows": rows,
+                "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+            }
+        return summary
+
+    def write_summary(self):
+        path = os.path.join(self.output_dir, "batch_summary.csv")
+        fields = ["coin_id", "subreddit", "window_days", "status", "error"]
+        for stage in AnalysisPipeline.STAGES:
+            fields += [f"{stage}_seconds", f"{stage}_rows"]
+
+        with open(path, "w", newline="") as summary_file:
+            writer = csv.DictWriter(summary_file, fieldnames=fields)
+            writer.writeheader()
+            for result in self.results:
+                row = {key: result[key] for key in fields[:5]}
+                for stage, timing in result["stages"].items():
+                    row[f"{stage}_seconds"] = round(timing["seconds"], 3)
+                    row[f"{stage}_rows"] = timing["rows"]
+                writer.writerow(row)
+        logging.info(f"Batch summary written to {path}")
+
+    def format_report(self):
+        ok = sum(1 for r in self.results if r["status"] == "ok")
+        lines = [
+            f"Jobs: {len(self.results)} ({ok} ok, {len(self.results) - ok} failed) "
+            f"in {self.total_seconds:.1f}s",
+            f"Window end: {self.end_datetime.isoformat(timespec='seconds')} "
+            f"(rerun with --end to reuse the stage cache)",
+            f"{'stage':<10} {'jobs':>5} {'cached':>6} {'seconds':>10} {'rows':>8} {'rows/s':>10}",
+        ]
+        for stage, stats in self.stage_summary().items():
+            lines.append(f"{stage:<10} {stats['jobs']:>5} {stats['cached']:>6} {stats['seconds']:>10.2f} "
+                         f"{stats['rows']:>8} {stats['rows_per_second']:>10.1f}")
+
+        from scripts.coingecko_api_fetch import CoingeckoFetchAPI
+        counters = CoingeckoFetchAPI.get_request_counters()
+        lines.append(f"CoinGecko: {counters['requests']} requests, {counters['retries']} retries, "
+                     f"{counters['throttled']} throttled, {counters['throttle_wait_seconds']:.1f}s waiting")
+        for result in self.results:
+            parity = result.get("parity")
+            if parity:
+                lines.append(f"Parity {result['coin_id']}/{result['subreddit']} ({parity['backend']}): "
+                             f"{parity['label_agreement']:.1%} label agreement, "
+                             f"max drift {parity['max_prob_drift']:.4f}, speedup {parity['speedup'] or 0:.2f}x")
+        for model, stats in self.models.get_stats().items():
+            rss = f", +{stats['rss_delta_mb']:.0f} MB RSS" if stats["rss_delta_mb"] is not None else ""
+            lines.append(f"Loaded {model} in {stats['load_seconds']:.1f}s{rss}")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run SentiMEME-MLysis for many coin/subreddit jobs.")
+    parser.add_argument("job_file", help="CSV with coin_id,subreddit,window_days columns")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--end", help="Window end as ISO datetime (default: now). Pass the end of a failed "
+                                      "batch to rerun it from the stage cache")
+    parser.add_argument("--batch-size", type=int, default=64, help="Maximum texts per inference batch")
+    parser.add_argument("--max-tokens", type=int, default=4096, help="Token budget per inference batch")
+    parser.add_argument("--sentiment-backend", default="pytorch", choices=["pytorch", "pytorch-int8", "onnx"])
+    parser.add_argument("--parity-check", action="store_true",
+                        help="Compare the sentiment backend against fp32 on each job's comments")
+    parser.add_argument("--topic-mode", default="full", choices=["full", "incremental"],
+                        help="'incremental' reuses each subreddit's saved topic model between runs")
+    parser.add_argument("--join", default="date", choices=["date", "asof"],
+                        help="'asof' joins each post to its nearest price sample instead of the whole day")
+    parser.add_argument("--price-horizons", help="Comma-separated horizons for asof price changes, e.g. 1h,4h,24h")
+    parser.add_argument("--market-features", action="store_true",
+                        help="Add log returns, volatility and volume features to the price columns")
+    parser.add_argument("--store-dir", help="Also accumulate results in a Parquet store partitioned by coin and date")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Overlap Reddit fetching with sentiment inference (topics are assigned at the end)")
+    parser.add_argument("--log-file", default="batch.log")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        filename=args.log_file,
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+    end_datetime = datetime.fromisoformat(args.end) if args.end else None
+    runner = BatchRunner.from_job_file(args.job_file, output_dir=args.output_dir,
+                                       end_datetime=end_datetime, batch_size=args.batch_size,
+                                       max_tokens=args.max_tokens, sentiment_backend=args.sentiment_backend,
+                                       check_parity=args.parity_check, topic_mode=args.topic_mode,
+                                       export_join=args.join, store_dir=args.store_dir,
+                                       market_features=args.market_features, streaming=args.streaming,
+                                       price_horizons=args.price_horizons.split(",") if args.price_horizons else None)
+    runner.run()
+    print(runner.format_report())
+    return 0 if all(r["status"] == "ok" for r in runner.results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -20,7 +20,10 @@ libraries = [
     "hdbscan",
     "sentence-transformers",
     "tkinter",
-    "tkcalendar"
+    "tkcalendar",
+    "pyarrow",
+    "psutil",  # optional
+    "onnxruntime"  # optional
 ]
 
 def get_library_version(lib_name):
@@ -1,14 +1,39 @@
 from scripts.coingecko_api_fetch import CoingeckoFetchAPI
+import json
 import logging
+import os
+import tempfile
+import time
 
+COIN_LIST_SNAPSHOT = os.path.join("cache", "coin_list.json")
+
+"""
+The coin list is kept as a compact local snapshot
+    {"fetched_at": <unix time>, "etag": <ETag or null>, "coins": [[id, symbol, name], ...]}
+so it loads instantly and keeps working offline. refresh() re-downloads it only
+when the snapshot is older than max_age_seconds, sending the stored ETag so an
+unchanged list costs a 304 instead of the full payload.
+"""
 class CoinListGenerator:
-    def __init__(self):
+    def __init__(self, snapshot_path=COIN_LIST_SNAPSHOT, max_age_seconds=24 * 3600, fetch_if_missing=True):
+        """
+        :param fetch_if_missing: Download the list right away if there is no snapshot yet
+            (the GUI passes False and refreshes in the background instead).
+        """
         self.coin_masterlist = []  # Ensure this exists even if an error occurs
-        try:
-            self.generate_coin_list()
-        except RuntimeError as e:
-            logging.error(f"CoinListGenerator Error: {e}")
-            raise
+        self.coins = []
+        self.snapshot_path = snapshot_path
+        self.max_age_seconds = max_age_seconds
+        self.fetched_at = 0
+        self.etag = None
+
+        self.load_snapshot()
+        if not self.coins and fetch_if_missing:
+            try:
+                self.generate_coin_list()
+            except RuntimeError as e:
+                logging.error(f"CoinListGenerator Error: {e}")
+                raise
 
     """
     Transform coin list from API into displayable format for GUI.
@@ -16,19 +41,93 @@ class CoinListGenerator:
     def generate_coin_list(self):
         try:
             self.extract_data()
-            initial_list = self.response.json()
-            self.coin_masterlist = [f"{coin['id']} ({coin['symbol']})" for coin in initial_list]
+            if self.response.status_code == 304:
+                logging.info("Coin list unchanged since the last snapshot")
+                self.fetched_at = time.time()
+                self.save_snapshot()
+                return False
 
-            if not self.coin_masterlist:
+            initial_list = self.response.json()
+            if not initial_list:
                 raise RuntimeError("Coingecko API error.")
+            self.set_coins(initial_list)
+            self.etag = self.response.headers.get("ETag")
+            self.fetched_at = time.time()
+            self.save_snapshot()
+            return True
 
         except Exception as e:
             logging.error(f"Unexpected error: {e}")
             raise RuntimeError(f"Failed to generate coin list. {e}") from e
 
-    # Calls CoinGecko API for list of coins
+    # Calls CoinGecko API for list of coins, conditional on the snapshot's ETag
     def extract_data(self):
-        self.response = CoingeckoFetchAPI.for_coin_list().retrieve_response()
+        etag = self.etag if self.coins else None
+        self.response = CoingeckoFetchAPI.for_coin_list(etag=etag).retrieve_response()
+
+    def set_coins(self, coins):
+        # Lists are replaced rather than mutated so readers on other threads see old or new, never half
+        self.coin_masterlist = [f"{coin['id']} ({coin['symbol']})" for coin in coins]
+        self.coins = coins
+
+    def is_stale(self):
+        return not self.coins or time.time() - self.fetched_at > self.max_age_seconds
+
+    def refresh(self, force=False):
+        """
+        Re-downloads the list if the snapshot is stale (or `force`).
+        :return: True if the coin list changed.
+        """
+        if not force and not self.is_stale():
+            return False
+        return self.generate_coin_list()
+
+    def load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            self.set_coins([{"id": coin_id, "symbol": symbol, "name": name}
+                            for coin_id, symbol, name in snapshot["coins"]])
+            self.fetched_at = snapshot.get("fetched_at", 0)
+            self.etag = snapshot.get("etag")
+            logging.info(f"Loaded {len(self.coins)} coins from {self.snapshot_path}")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable coin list snapshot {self.snapshot_path}: {e}")
+
+    def save_snapshot(self):
+        directory = os.path.dirname(self.snapshot_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        snapshot = {
+            "fetched_at": self.fetched_at,
+            "etag": self.etag,
+            "coins": [[coin.get("id"), coin.get("symbol"), coin.get("name")] for coin in self.coins],
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as snapshot_file:
+                json.dump(snapshot, snapshot_file, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logging.warning(f"Failed to write coin list snapshot {self.snapshot_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     def get_list(self):
         return self.coin_masterlist
+
+    # Raw coin records (id, symbol, name) used to build the search index
+    def get_coins(self):
+        return self.coins
+
+    # Keywords a coin may be mentioned by on Reddit: its id, symbol and name
+    def get_aliases(self, coin_id):
+        for coin in self.coins:
+            if coin.get('id') == coin_id:
+                aliases = []
+                for alias in (coin.get('id'), coin.get('symbol'), coin.get('name')):
+                    if alias and alias.lower() not in [a.lower() for a in aliases]:
+                        aliases.append(alias)
+                return aliases
+        return [coin_id]
@@ -0,0 +1,117 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+"""
+CoinSearchIndex is a precomputed search index over the CoinGecko coin list
+for the ticker autocomplete.
+
+Prefix lookups use sorted term arrays (a flattened prefix trie: every term
+sharing a prefix sits in one contiguous, bisectable slice) for coin symbol,
+id and name words; queries of three or more characters also match substrings
+through a trigram index. Coins are renumbered by (id length, id) so that
+within a rank tier the smallest indices are the best matches, and tiers are
+only expanded until `limit` results are found.
+"""
+class CoinSearchIndex:
+    NGRAM = 3
+
+    def __init__(self, coins):
+        """
+        :param coins: Iterable of dicts with 'id', 'symbol' and 'name' keys (CoinGecko /coins/list).
+        """
+        coins = sorted(coins, key=lambda coin: (len(str(coin.get("id", ""))), str(coin.get("id", "")).lower()))
+
+        self.entries = []
+        self.keys = []
+        self.exact = defaultdict(list)  # symbol/id -> indices
+        self.exact_name = defaultdict(list)
+        symbol_terms, id_terms, word_terms = [], [], []
+        self.ngrams = defaultdict(list)
+
+        for index, coin in enumerate(coins):
+            coin_id = str(coin.get("id", "")).lower()
+            symbol = str(coin.get("symbol", "")).lower()
+            name = str(coin.get("name", "")).lower()
+            self.entries.append(f"{coin.get('id', '')} ({coin.get('symbol', '')})")
+            self.keys.append((coin_id, symbol, name))
+
+            self.exact[symbol].append(index)
+            if coin_id != symbol:
+                self.exact[coin_id].append(index)
+            self.exact_name[name].append(index)
+
+            symbol_terms.append((symbol, index))
+            id_terms.append((coin_id, index))
+            for word in {name, *name.split(), *coin_id.split("-")}:
+                word_terms.append((word, index))
+
+            for gram in self.grams(coin_id) | self.grams(symbol) | self.grams(name):
+                self.ngrams[gram].append(index)
+
+        self.symbol_terms = sorted(symbol_terms)
+        self.id_terms = sorted(id_terms)
+        self.word_terms = sorted(word_terms)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def grams(cls, text):
+        return {text[i:i + cls.NGRAM] for i in range(len(text) - cls.NGRAM + 1)}
+
+    @staticmethod
+    def prefix_range(terms, query):
+        """Indices of every term starting with `query` (one contiguous slice of the sorted array)."""
+        low = bisect_left(terms, (query,))
+        high = bisect_left(terms, (query + "\uffff",))
+        return {index for _, index in terms[low:high]}
+
+    def substring_matches(self, query):
+        """Yields, best first, the indices of coins containing `query`."""
+        postings = sorted((self.ngrams.get(gram, ()) for gram in self.grams(query)), key=len)
+        if not postings or not postings[0]:
+            return
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return
+        # Trigram hits are only candidates; confirm the full substring lazily
+        for index in sorted(candidates):
+            if any(query in key for key in self.keys[index]):
+                yield index
+
+    def search(self, query, limit=50):
+        """
+        Returns up to `limit` display entries ("id (symbol)") matching `query`, best first:
+        exact symbol/id, exact name, symbol prefix, id prefix, name word prefix, then substring.
+        Queries shorter than the n-gram size only match exactly or by prefix.
+        """
+        query = query.strip().lower()
+        if " (" in query:
+            # A previously selected "id (symbol)" entry is being edited
+            query = query.split(" (")[0]
+        if not query:
+            return []
+
+        # Each tier is only evaluated if the better tiers did not fill `limit`
+        tiers = [
+            lambda: self.exact.get(query, ()),
+            lambda: self.exact_name.get(query, ()),
+            lambda: sorted(self.prefix_range(self.symbol_terms, query)),
+            lambda: sorted(self.prefix_range(self.id_terms, query)),
+            lambda: sorted(self.prefix_range(self.word_terms, query)),
+        ]
+        if len(query) >= self.NGRAM:
+            tiers.append(lambda: self.substring_matches(query))
+
+        results = []
+        seen = set()
+        for tier in tiers:
+            for index in tier():
+                if len(results) == limit:
+                    return [self.entries[i] for i in results]
+                if index not in seen:
+                    seen.add(index)
+                    results.append(index)
+        return [self.entries[i] for i in results]
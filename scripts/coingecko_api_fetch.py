@@ -2,6 +2,7 @@ import requests
 import os
 from dotenv import load_dotenv
 import logging
+from scripts.http_client import get_coingecko_client
 
 class CoingeckoFetchAPI:
     load_dotenv()
@@ -13,25 +14,44 @@ class CoingeckoFetchAPI:
             "accept": "application/json",
             "x-cg-demo-api-key": self.api_key
         }
+        self.response = None
+
+    # Sends the request through the shared rate-limited session
+    def fetch(self):
         try:
-            self.response = requests.get(self.url, headers=self.headers)
-        except requests.exceptions.ConnectionError:
+            self.response = get_coingecko_client().get(self.url, headers=self.headers)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             logging.error("No internet connection detected.")
             raise RuntimeError("No internet connection. Please connect and restart.")
-
+        return self.response
 
     def retrieve_response(self):
+        if self.response is None:
+            self.fetch()
+
         if self.response.status_code == 200:
             logging.info("Coingecko API fetch successful!")
             return self.response
+        elif self.response.status_code == 304:
+            # Conditional request (If-None-Match): the caller's copy is still current
+            return self.response
+        elif self.response.status_code == 429:
+            raise ValueError("Coingecko rate limit exceeded. Please try again later.")
         else:
             raise ValueError(f"Please check your ticker input {self.response}")
 
+    @staticmethod
+    def get_request_counters():
+        return get_coingecko_client().get_counters()
+
     #Factory Methods
     @classmethod
-    def for_coin_list(cls):
+    def for_coin_list(cls, etag=None):
         url = "https://api.coingecko.com/api/v3/coins/list"
-        return cls(url)
+        api = cls(url)
+        if etag:
+            api.headers["If-None-Match"] = etag
+        return api
 
     @classmethod
     def for_market_data(cls, start, end, coin_name, currency="usd", precision="2"):
@@ -39,4 +59,4 @@ class CoingeckoFetchAPI:
             f"https://api.coingecko.com/api/v3/coins/{coin_name}/market_chart/range"
             f"?vs_currency={currency}&from={start}&to={end}&precision={precision}"
         )
-        return cls(url)
\ No newline at end of file
+        return cls(url)
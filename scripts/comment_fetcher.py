@@ -0,0 +1,130 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import prawcore
+from scripts import tracing
+from scripts.http_client import TokenBucket, parse_retry_after
+
+"""
+CommentFetcher hydrates the top comments of many Reddit posts concurrently.
+PRAW instances are not thread-safe, so every worker thread gets its own
+authenticated Reddit instance. All workers share one token bucket sized to
+Reddit's OAuth budget, and each post is retried on its own, so one failing
+post no longer aborts the whole search.
+"""
+class CommentFetcher:
+    def __init__(self, reddit_factory, max_workers=4, requests_per_minute=90, max_retries=3,
+                 top_n=5, backoff_base=2.0):
+        """
+        :param reddit_factory: Callable returning a new authenticated praw.Reddit instance.
+        :param max_workers: Number of posts hydrated in parallel.
+        :param requests_per_minute: Shared request budget (Reddit OAuth allows 100 per minute).
+        :param max_retries: Retries per post before it is counted as failed.
+        :param top_n: Number of top-level comments kept per post.
+        """
+        self.reddit_factory = reddit_factory
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(requests_per_minute, per=60.0, capacity=max_workers)
+        self.max_retries = max_retries
+        self.top_n = top_n
+        self.backoff_base = backoff_base
+
+        self.local = threading.local()
+        self.counts_lock = threading.Lock()
+        self.counts = {"fetched": 0, "failed": 0, "throttled": 0, "retries": 0}
+
+    def count(self, name):
+        with self.counts_lock:
+            self.counts[name] += 1
+
+    def get_counts(self):
+        with self.counts_lock:
+            return dict(self.counts)
+
+    def thread_reddit(self):
+        if getattr(self.local, "reddit", None) is None:
+            self.local.reddit = self.reddit_factory()
+        return self.local.reddit
+
+    def fetch_one(self, post_id):
+        """Returns the top comment bodies of one post, or None once all retries have failed."""
+        with tracing.span("reddit.comments", post_id=post_id) as comments_span:
+            comments = self.fetch_with_retries(post_id)
+            comments_span.rows = len(comments) if comments is not None else 0
+            return comments
+
+    def fetch_with_retries(self, post_id):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                tracing.count_api_call("reddit")
+                submission = self.thread_reddit().submission(id=post_id)
+                submission.comments.replace_more(limit=0)
+                comments = [comment.body for comment in submission.comments[:self.top_n]]
+                self.count("fetched")
+                return comments
+
+            except prawcore.exceptions.TooManyRequests as e:
+                self.count("throttled")
+                retry_after = self.retry_after(e)
+                delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+                logging.warning(f"Rate limited fetching comments for post {post_id}; waiting {delay:.1f}s")
+
+            except (prawcore.exceptions.NotFound, prawcore.exceptions.Forbidden) as e:
+                # Removed or private posts won't succeed on retry
+                logging.warning(f"Comments unavailable for post {post_id}: {e}")
+                break
+
+            except Exception as e:
+                delay = self.backoff_delay(attempt)
+                logging.warning(f"Failed to fetch comments for post {post_id} "
+                                f"(Attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+
+            if attempt < self.max_retries:
+                self.count("retries")
+                time.sleep(delay)
+
+        self.count("failed")
+        logging.error(f"Giving up on comments for post {post_id}")
+        return None
+
+    def backoff_delay(self, attempt):
+        return random.uniform(0, self.backoff_base * 2 ** attempt)
+
+    @staticmethod
+    def retry_after(error):
+        """Seconds from the Retry-After header of a throttled response (capped), or None."""
+        response = getattr(error, "response", None)
+        return parse_retry_after(response.headers) if response is not None else None
+
+    def fetch_all(self, post_ids, progress_callback=None):
+        """
+        Hydrates every post in `post_ids` concurrently.
+        :return: Dict of post id -> list of comment bodies. Posts that failed are left out.
+        """
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reddit-comments")
+        try:
+            futures = {executor.submit(self.fetch_one, post_id): post_id for post_id in post_ids}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    comments = future.result()
+                except Exception as e:
+                    # One broken post must not abort the hydration of the others
+                    logging.error(f"Comment fetch for post {futures[future]} failed: {e}")
+                    self.count("failed")
+                    comments = None
+                if comments is not None:
+                    results[futures[future]] = comments
+                if progress_callback is not None:
+                    counts = self.get_counts()
+                    progress_callback("reddit", done, len(futures),
+                                      f"comments fetched ({counts['failed']} failed, {counts['throttled']} throttled)")
+        finally:
+            # On cancellation, drop posts that have not started yet
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        logging.info(f"Comment hydration: {self.get_counts()}")
+        return results
@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import numpy as np
+from scripts import tracing
+from scripts.sqlite_util import select_in
+
+"""
+EmbeddingStore persists sentence embeddings so that texts encoded in earlier
+runs are not re-encoded. There is one store per embedding model:
+
+    <store_dir>/<model>/vectors.bin    - row-major matrix, appended to, read via np.memmap
+    <store_dir>/<model>/index.sqlite   - text hash -> row number, plus the matrix dim/dtype
+
+Only texts missing from the index are encoded (in batches); the assembled
+matrix can be passed straight to BERTopic as precomputed embeddings.
+"""
+class EmbeddingStore:
+    def __init__(self, model_name, store_dir=os.path.join("cache", "embeddings"), dtype="float32",
+                 encode_batch_size=64):
+        """
+        :param model_name: Embedding model the vectors belong to.
+        :param dtype: "float32" or "float16" (halves disk use; vectors are returned as float32).
+        :param encode_batch_size: Texts per encode() call for new texts.
+        """
+        self.model_name = model_name
+        self.dir = os.path.join(store_dir, model_name.replace("/", "__"))
+        self.vectors_path = os.path.join(self.dir, "vectors.bin")
+        self.encode_batch_size = encode_batch_size
+        self.lock = threading.Lock()
+        self.encoded = 0
+        self.reused = 0
+
+        os.makedirs(self.dir, exist_ok=True)
+        try:
+            self.conn = sqlite3.connect(os.path.join(self.dir, "index.sqlite"), check_same_thread=False)
+            with self.conn:
+                self.conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL);
+                    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                """)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open embedding store {self.dir}: {e}")
+            raise RuntimeError("Failed to open embedding store.") from e
+
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        self.dtype = np.dtype(meta.get("dtype", dtype))
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+    def row_count(self):
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+
+    def lookup_rows(self, hashes):
+        return dict(select_in(self.conn, "SELECT hash, row FROM vectors WHERE hash IN ({placeholders})", hashes))
+
+    def append(self, hashes, vectors):
+        """Appends new vectors to the matrix file and indexes them."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                      [("dim", str(self.dim)), ("dtype", self.dtype.name)])
+        first_row = self.row_count()
+        with open(self.vectors_path, "ab") as vectors_file:
+            vectors_file.write(vectors.astype(self.dtype).tobytes())
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO vectors (hash, row) VALUES (?, ?)",
+                                  [(text_hash, first_row + i) for i, text_hash in enumerate(hashes)])
+
+    def get_embeddings(self, texts, encoder, progress_callback=None):
+        """
+        Returns a float32 (len(texts), dim) matrix of embeddings in the order of `texts`.
+        :param encoder: Model with a SentenceTransformer-style encode(texts, batch_size=...) method,
+            used only for texts not already in the store.
+        """
+        with self.lock:
+            hashes = [self.text_hash(text) for text in texts]
+            rows = self.lookup_rows(hashes)
+
+            missing = {}
+            for text_hash, text in zip(hashes, texts):
+                if text_hash not in rows and text_hash not in missing:
+                    missing[text_hash] = text
+            self.reused += len(texts) - len(missing)
+
+            missing_hashes = list(missing)
+            for start in range(0, len(missing_hashes), self.encode_batch_size):
+                batch = missing_hashes[start:start + self.encode_batch_size]
+                with tracing.span("topic.embed_batch") as batch_span:
+                    vectors = encoder.encode([missing[text_hash] for text_hash in batch],
+                                             batch_size=self.encode_batch_size, show_progress_bar=False)
+                    self.append(batch, vectors)
+                    batch_span.rows = len(batch)
+                self.encoded += len(batch)
+                if progress_callback is not None:
+                    progress_callback("topic", start + len(batch), len(missing_hashes), "texts embedded")
+            if missing:
+                rows = self.lookup_rows(hashes)
+                logging.info(f"Embedding store: encoded {len(missing)} new texts, "
+                             f"reused {len(texts) - len(missing)}")
+
+            if not texts:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(self.row_count(), self.dim))
+            return np.asarray(matrix[[rows[text_hash] for text_hash in hashes]], dtype=np.float32)
+
+    def close(self):
+        self.conn.close()
@@ -1,8 +1,24 @@
 import pandas as pd
 import logging
 
+"""
+ExportCSV merges the sentiment and numeric data and writes the dashboard CSV.
+
+join="date" pairs every post with every price sample of the same day (one row
+per post and sample). join="asof" pairs each post with a single price sample,
+the nearest one (or the latest one before the post with direction="backward")
+within `tolerance`, so the output has exactly one row per post. With
+`price_horizons` (e.g. ["1h", "24h"]) the asof join also adds the relative price
+change from the matched sample to the price that far after the post.
+"""
+JOIN_MODES = ("date", "asof")
+
+
 class ExportCSV:
-    def __init__(self, df_text, df_num):
+    def __init__(self, df_text, df_num, filename="merged_exported_data.csv", join="date",
+                 direction="nearest", tolerance="1h", price_horizons=None, write_csv=True):
+        if join not in JOIN_MODES:
+            raise ValueError(f"Unknown join mode '{join}'. Choose one of {', '.join(JOIN_MODES)}.")
         self.df_text = df_text.copy()
         self.df_num = df_num.copy()
 
@@ -21,14 +37,50 @@ class ExportCSV:
             # Compute average sentiment per hour
             self.df_text['avg_sentiment'] = self.df_text.groupby('Hour')['sentiment_num'].transform('mean')
 
-            # Merge text and numeric data on Date
-            self.df = pd.merge(self.df_text, self.df_num, on='Date', how='left')
+            if join == "asof":
+                self.df = self.asof_merge(self.df_text, self.df_num, direction, pd.Timedelta(tolerance),
+                                          price_horizons or [])
+            else:
+                # Merge text and numeric data on Date
+                self.df = pd.merge(self.df_text, self.df_num, on='Date', how='left')
 
             # Export merged dataframe to CSV
-            filename = "merged_exported_data.csv"
-            self.df.to_csv(filename, index=False)
-            logging.info(f"Merged data exported successfully to {filename}")
+            self.filename = filename
+            if write_csv:
+                self.df.to_csv(filename, index=False)
+                logging.info(f"Merged data exported successfully to {filename}")
 
         except Exception as e:
             logging.error(f"ExportCSV error: {e}")
             raise RuntimeError("Failed to process and export merged CSV.") from e
+
+    @staticmethod
+    def to_utc(values):
+        # Numeric timestamps may be datetimes or strings such as "2025-01-01 08:00:00.123000+08:00".
+        # One resolution for both sides: merge_asof rejects keys of different units (ms vs us).
+        return pd.to_datetime(values, utc=True, errors="coerce", format="mixed").dt.as_unit("ns")
+
+    @classmethod
+    def asof_merge(cls, df_text, df_num, direction, tolerance, price_horizons):
+        """One row per post: the post joined to its matching price sample (columns left empty if none)."""
+        text = df_text.assign(_order=range(len(df_text)), _post_ts=cls.to_utc(df_text["created"]))
+        prices = df_num.drop(columns=["Date"]).assign(_price_ts=cls.to_utc(df_num["Timestamp"]))
+        prices = prices.dropna(subset=["_price_ts"]).sort_values("_price_ts")
+
+        matched = text.dropna(subset=["_post_ts"]).sort_values("_post_ts")
+        merged = pd.merge_asof(matched, prices, left_on="_post_ts", right_on="_price_ts",
+                               direction=direction, tolerance=tolerance, suffixes=("_x", "_y"))
+
+        # Price change after each post, relative to the matched sample
+        price_points = prices[["_price_ts", "Price"]].rename(columns={"Price": "_future_price"})
+        for horizon in price_horizons:
+            target = merged[["_post_ts"]].assign(_target_ts=merged["_post_ts"] + pd.Timedelta(horizon))
+            target = target.reset_index().sort_values("_target_ts")
+            future = pd.merge_asof(target, price_points, left_on="_target_ts", right_on="_price_ts",
+                                   direction="nearest", tolerance=tolerance).set_index("index")["_future_price"]
+            merged[f"price_change_{horizon}"] = future.sort_index() / merged["Price"] - 1
+
+        # Posts without a parseable time are kept, unmatched
+        unmatched = text[text["_post_ts"].isna()]
+        merged = pd.concat([merged, unmatched], ignore_index=True) if len(unmatched) else merged
+        return merged.sort_values("_order").drop(columns=["_order", "_post_ts", "_price_ts"]).reset_index(drop=True)
@@ -0,0 +1,155 @@
+import logging
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from scripts import tracing
+
+"""
+Shared HTTP plumbing for the API wrappers: a keep-alive session with a
+token-bucket rate limiter, jittered retry on 429/5xx that honours
+Retry-After, explicit timeouts and request counters.
+"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per `per` seconds with bursts up to `capacity`."""
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.rate = float(rate)
+        self.per = float(per)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / self.per)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) * self.per / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# Longest Retry-After any client honours; a worker sleeping longer would also hold up cancellation
+RETRY_AFTER_MAX = 300.0
+
+
+def parse_retry_after(headers, max_seconds=RETRY_AFTER_MAX):
+    """
+    Seconds to wait from a Retry-After header, or None if absent or unparseable (the HTTP-date
+    form included), in which case callers fall back to their own backoff.
+    :param max_seconds: Upper bound for the wait; longer requests are clamped and logged.
+    """
+    value = headers.get("Retry-After") if headers is not None else None
+    try:
+        seconds = max(0.0, float(value)) if value else None
+    except (TypeError, ValueError):
+        return None
+    if seconds is not None and max_seconds is not None and seconds > max_seconds:
+        logging.warning(f"Server asked to wait {seconds:.0f}s; capping the wait at {max_seconds:.0f}s")
+        seconds = max_seconds
+    return seconds
+
+
+class RateLimitedClient:
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, rate_per_minute=30, burst=None, connect_timeout=5.0, read_timeout=30.0,
+                 max_retries=4, backoff_base=1.0, backoff_max=60.0, retry_after_max=RETRY_AFTER_MAX, pool_size=10,
+                 name="http"):
+        """
+        :param rate_per_minute: Allowed requests per minute (CoinGecko demo plan: 30).
+        :param burst: Maximum burst size (default: one minute's worth of requests).
+        :param connect_timeout: Seconds to wait for the TCP/TLS connection.
+        :param read_timeout: Seconds to wait for the response.
+        :param max_retries: Retries for 429/5xx and connection errors before giving up.
+        :param backoff_max: Longest jittered backoff between retries.
+        :param retry_after_max: Longest Retry-After the client honours (the server value is used up to this).
+        :param name: API name under which requests are counted in traces.
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute, per=60.0, capacity=burst)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.counters_lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "throttle_wait_seconds": 0.0}
+
+    def count(self, name, amount=1):
+        with self.counters_lock:
+            self.counters[name] += amount
+
+    def get_counters(self):
+        with self.counters_lock:
+            return dict(self.counters)
+
+    def get(self, url, headers=None):
+        """GETs `url` within the rate limit, retrying throttled, failed and 5xx responses."""
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            if waited:
+                self.count("throttle_wait_seconds", waited)
+            self.count("requests")
+            tracing.count_api_call(self.name)
+
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logging.warning(f"Request to {url} failed ({e}); retrying in {delay:.1f}s")
+                self.count("retries")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            if response.status_code == 429:
+                self.count("throttled")
+            delay = self.retry_after(response) or self.backoff_delay(attempt)
+            logging.warning(f"HTTP {response.status_code} from {url}; retrying in {delay:.1f}s "
+                            f"(attempt {attempt + 1}/{self.max_retries})")
+            self.count("retries")
+            time.sleep(delay)
+
+    def backoff_delay(self, attempt):
+        # Full jitter exponential backoff
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def retry_after(self, response):
+        return parse_retry_after(response.headers, self.retry_after_max)
+
+
+_coingecko_client = None
+_coingecko_client_lock = threading.Lock()
+
+
+def get_coingecko_client():
+    """Returns the process-wide CoinGecko client, sized from COINGECKO_RATE_LIMIT_PER_MIN."""
+    global _coingecko_client
+    with _coingecko_client_lock:
+        if _coingecko_client is None:
+            rate = float(os.getenv("COINGECKO_RATE_LIMIT_PER_MIN", "30"))
+            _coingecko_client = RateLimitedClient(rate_per_minute=rate, name="coingecko")
+        return _coingecko_client
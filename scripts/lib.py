@@ -13,7 +13,14 @@ packages = [
     "transformers",
     "dotenv",
     "requests",
-    "tzlocal"
+    "tzlocal",
+    "pyarrow"
+]
+
+# Optional packages: psutil reports model memory use, onnxruntime enables the "onnx" sentiment backend
+optional_packages = [
+    "psutil",
+    "onnxruntime"
 ]
 
 # Function to install missing packages
@@ -26,4 +33,9 @@ def install_packages(packages):
             print(f"Installing {package}...")
             subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
-install_packages(packages)
\ No newline at end of file
+install_packages(packages)
+for package in optional_packages:
+    try:
+        install_packages([package])
+    except subprocess.CalledProcessError as e:
+        print(f"Skipping optional package {package}: {e}")
\ No newline at end of file
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from scripts.coingecko_api_fetch import CoingeckoFetchAPI
+from scripts.range_planner import DAY, RangePlanner
+
+"""
+MarketDataCache keeps CoinGecko market_chart series on disk, one JSON file
+per coin/currency/precision/resolution. It remembers which time intervals have
+already been fetched so a request only downloads the sub-ranges that are missing.
+Missing sub-ranges longer than 90 days are split by RangePlanner and fetched
+in parallel, so long windows keep hourly resolution.
+
+CoinGecko picks the granularity from the requested range (5-minute data up to a
+day, hourly beyond), so the two never share a file: windows of a day or less use
+the "5m" cache, longer windows the "1h" cache, whose short gaps are widened to a
+little over a day before they are fetched so they come back hourly as well.
+"""
+FINE_RESOLUTION = "5m"
+HOURLY_RESOLUTION = "1h"
+class MarketDataCache:
+    SERIES = ("prices", "market_caps", "total_volumes")
+
+    # Serialises read-modify-write of the same cache file across threads
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, cache_dir=os.path.join("cache", "market_chart"), min_gap_seconds=60, planner=None):
+        """
+        :param cache_dir: Directory holding the cached series.
+        :param min_gap_seconds: Missing sub-ranges shorter than this are not worth a request.
+        :param planner: RangePlanner splitting long sub-ranges into hourly-resolution chunks.
+        """
+        self.cache_dir = cache_dir
+        self.min_gap_seconds = min_gap_seconds
+        self.planner = planner or RangePlanner()
+        self.requests_made = 0
+        self.gaps = []
+
+    def cache_path(self, coin_name, currency, precision, resolution=HOURLY_RESOLUTION):
+        return os.path.join(self.cache_dir, f"{coin_name}_{currency}_{precision}_{resolution}.json")
+
+    @staticmethod
+    def resolution_for(start, end):
+        """Granularity CoinGecko returns for a window of this length."""
+        return FINE_RESOLUTION if end - start <= DAY else HOURLY_RESOLUTION
+
+    @staticmethod
+    def widen_gap(gap, resolution):
+        """Stretches gaps of the hourly cache back to just over a day, so they are not answered in 5-minute steps."""
+        gap_start, gap_end = gap
+        if resolution == HOURLY_RESOLUTION and gap_end - gap_start <= DAY:
+            gap_start = gap_end - DAY - 3600
+        return [gap_start, gap_end]
+
+    def get_market_data(self, start, end, coin_name, currency="usd", precision="2", interval_seconds=None):
+        """
+        Returns market_chart data for [start, end] (unix seconds) in the same shape as the
+        CoinGecko response: {"prices": [[ms, value], ...], "market_caps": ..., "total_volumes": ...}
+        :param interval_seconds: If set, every series is regularised to one point per interval.
+        """
+        resolution = self.resolution_for(start, end)
+        path = self.cache_path(coin_name, currency, precision, resolution)
+        with self.lock_for(path):
+            cached = self.load(path)
+            missing = [self.widen_gap(gap, resolution)
+                       for gap in self.missing_ranges(cached["intervals"], start, end, self.min_gap_seconds)]
+            chunks = [chunk for gap_start, gap_end in missing for chunk in self.planner.plan(gap_start, gap_end)]
+            if chunks:
+                logging.info(f"Market data cache miss for {coin_name}: {len(missing)} ranges in {len(chunks)} requests")
+
+            def fetch_chunk(chunk_start, chunk_end):
+                return CoingeckoFetchAPI.for_market_data(
+                    chunk_start, chunk_end, coin_name, currency, precision).retrieve_response().json()
+
+            errors = []
+            for chunk, fetched, error in self.planner.fetch(chunks, fetch_chunk):
+                self.requests_made += 1
+                if error is not None:
+                    errors.append(error)
+                    continue
+                if not fetched.get("prices"):
+                    # Not recorded as covered, so the range is asked for again next time
+                    logging.warning(f"CoinGecko returned no {coin_name} prices for {chunk[0]:.0f}-{chunk[1]:.0f}")
+                    continue
+                for series in self.SERIES:
+                    cached[series] = self.merge_series(cached[series], fetched.get(series, []), chunk)
+                cached["intervals"] = self.merge_intervals(cached["intervals"] + [chunk])
+
+            if len(errors) < len(chunks):
+                # Keep the chunks that did arrive, even if others failed
+                self.save(path, cached)
+            elif not chunks:
+                logging.info(f"Market data cache hit for {coin_name}")
+            if errors:
+                raise errors[0]
+
+        start_ms, end_ms = start * 1000, end * 1000
+        window = {
+            series: [point for point in cached[series] if start_ms <= point[0] <= end_ms]
+            for series in self.SERIES
+        }
+        if interval_seconds:
+            window = {series: RangePlanner.regularize(points, interval_seconds)
+                      for series, points in window.items()}
+            self.gaps = RangePlanner.continuity_gaps(window["prices"], interval_seconds)
+            if self.gaps:
+                logging.warning(f"{coin_name} prices have {len(self.gaps)} gaps longer than "
+                                f"{interval_seconds}s after stitching: {self.gaps[:5]}")
+        return window
+
+    @classmethod
+    def lock_for(cls, path):
+        with cls._locks_guard:
+            return cls._locks.setdefault(path, threading.Lock())
+
+    def load(self, path):
+        empty = {"intervals": [], **{series: [] for series in self.SERIES}}
+        if not os.path.exists(path):
+            return empty
+        try:
+            with open(path) as cache_file:
+                cached = json.load(cache_file)
+            return {key: cached.get(key, []) for key in empty}
+        except (OSError, ValueError) as e:
+            # A corrupt cache is only a performance problem; start over
+            logging.warning(f"Ignoring unreadable market data cache {path}: {e}")
+            return empty
+
+    def save(self, path, cached):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(cached, tmp_file, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Failed to write market data cache {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def merge_intervals(intervals):
+        """Sorts and coalesces overlapping or touching [start, end] intervals."""
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    @staticmethod
+    def missing_ranges(intervals, start, end, min_gap_seconds=0):
+        """Returns the parts of [start, end] not covered by the (merged) cached intervals."""
+        missing = []
+        cursor = start
+        for cached_start, cached_end in intervals:
+            if cached_end < cursor:
+                continue
+            if cached_start > end:
+                break
+            if cached_start > cursor:
+                missing.append([cursor, cached_start])
+            cursor = max(cursor, cached_end)
+        if cursor < end:
+            missing.append([cursor, end])
+        return [gap for gap in missing if gap[1] - gap[0] >= min_gap_seconds]
+
+    @staticmethod
+    def merge_series(existing, new, replace_range=None):
+        """
+        Merges two [[ms, value], ...] series, newer values winning on duplicate timestamps.
+        :param replace_range: [start, end] (unix seconds) the new series covers; existing points
+            inside it are dropped, so an overlapping refetch does not leave near-duplicate samples.
+        """
+        if replace_range is not None:
+            start_ms, end_ms = replace_range[0] * 1000, replace_range[1] * 1000
+            existing = [point for point in existing if not start_ms <= point[0] <= end_ms]
+        merged = {point[0]: point for point in existing}
+        merged.update((point[0], point) for point in new)
+        return [merged[timestamp] for timestamp in sorted(merged)]
@@ -0,0 +1,105 @@
+import logging
+import numpy as np
+import pandas as pd
+
+"""
+MarketFeatureEngine computes market features over the long-format numeric data
+(one row per coin and sample, as produced by NumericSubsystem.transform_numbers):
+
+    Coin Ticker, Timestamp, Price, Market Cap, Total Volume
+
+Everything is computed column-wise for all coins at once: rows are sorted by
+coin and time once, and windows never cross from one coin into the next.
+
+    log_return         log(Price_t / Price_t-1)
+    volatility         rolling standard deviation of log_return
+    volume_log_change  log(Total Volume_t / Total Volume_t-1)
+    relative_volume    Total Volume / its rolling mean
+    turnover           Total Volume / Market Cap
+
+ohlc() resamples prices to open/high/low/close bars at any pandas frequency.
+"""
+COIN = "Coin Ticker"
+
+
+class MarketFeatureEngine:
+    def __init__(self, volatility_window=24, volume_window=24):
+        """
+        :param volatility_window: Samples in the rolling volatility window (24 = one day of hourly data).
+        :param volume_window: Samples in the rolling mean used for relative volume.
+        """
+        self.volatility_window = volatility_window
+        self.volume_window = volume_window
+
+    @staticmethod
+    def sort(df):
+        return df.sort_values([COIN, "Timestamp"], kind="stable").reset_index(drop=True)
+
+    @staticmethod
+    def group_starts(coins):
+        """Boolean mask marking the first row of every coin in data sorted by coin."""
+        coins = np.asarray(coins)
+        starts = np.ones(len(coins), dtype=bool)
+        starts[1:] = coins[1:] != coins[:-1]
+        return starts
+
+    @staticmethod
+    def log_diff(values, starts):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs = np.log(np.asarray(values, dtype=np.float64))
+        diff = np.empty_like(logs)
+        diff[0] = np.nan
+        diff[1:] = logs[1:] - logs[:-1]
+        diff[starts] = np.nan
+        diff[~np.isfinite(diff)] = np.nan
+        return diff
+
+    @staticmethod
+    def rolling(values, coins, window, func):
+        """Rolling statistic per coin; `func` is a pandas Rolling method name such as "std"."""
+        rolled = pd.Series(values).groupby(np.asarray(coins), sort=False).rolling(window, min_periods=2)
+        return getattr(rolled, func)().reset_index(level=0, drop=True).sort_index().to_numpy()
+
+    def add_features(self, df):
+        """Returns a copy of `df`, sorted by coin and time, with the feature columns added."""
+        if df.empty:
+            return df.assign(log_return=[], volatility=[], volume_log_change=[], relative_volume=[], turnover=[])
+
+        df = self.sort(df)
+        coins = df[COIN].to_numpy()
+        starts = self.group_starts(coins)
+
+        df["log_return"] = self.log_diff(df["Price"], starts)
+        df["volatility"] = self.rolling(df["log_return"].to_numpy(), coins, self.volatility_window, "std")
+
+        if "Total Volume" in df:
+            volume = df["Total Volume"].to_numpy(dtype=np.float64)
+            df["volume_log_change"] = self.log_diff(volume, starts)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                df["relative_volume"] = volume / self.rolling(volume, coins, self.volume_window, "mean")
+                if "Market Cap" in df:
+                    market_cap = df["Market Cap"].to_numpy(dtype=np.float64)
+                    df["turnover"] = np.where(market_cap > 0, volume / market_cap, np.nan)
+        return df
+
+    @staticmethod
+    def ohlc(df, interval="1D"):
+        """
+        Open/high/low/close price bars per coin.
+        :param interval: pandas frequency string, e.g. "1h", "4h", "1D".
+        """
+        aggregations = {"open": ("Price", "first"), "high": ("Price", "max"),
+                        "low": ("Price", "min"), "close": ("Price", "last"),
+                        "samples": ("Price", "count")}
+        if "Total Volume" in df:
+            # CoinGecko volumes are rolling 24h totals, so bars take their mean
+            aggregations["volume"] = ("Total Volume", "mean")
+        if "Market Cap" in df:
+            aggregations["market_cap"] = ("Market Cap", "last")
+
+        try:
+            bars = df.groupby([COIN, pd.Grouper(key="Timestamp", freq=interval)], sort=True).agg(**aggregations)
+        except (ValueError, TypeError) as e:
+            logging.error(f"Failed to resample market data to {interval}: {e}")
+            raise RuntimeError(f"Invalid OHLC interval {interval}.") from e
+        return bars[bars["samples"] > 0].reset_index()
@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+"""
+ModelRegistry loads each model once per process, keyed by (kind, model name),
+and hands the same instance to every analysis. warm_up() starts loading the
+default models (and the heavy torch/transformers/bertopic imports) on a
+background thread so the first analysis does not pay the cold start.
+"""
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None if it cannot be determined."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        # Linux without psutil: second field of statm is resident pages
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def load_embedding_model(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def load_sentiment_model(model_name):
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    return (AutoTokenizer.from_pretrained(model_name),
+            AutoModelForSequenceClassification.from_pretrained(model_name))
+
+
+def load_pipeline_imports(_name):
+    # Importing these modules pulls in torch, transformers, bertopic, umap and hdbscan
+    import scripts.topic_model
+    import scripts.sentiment_analysis
+    return True
+
+
+class ModelRegistry:
+    DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    DEFAULT_SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.loaders = {
+            "imports": load_pipeline_imports,
+            "embedding": load_embedding_model,
+            "sentiment": load_sentiment_model,
+        }
+        self.models = {}
+        self.stats = {}
+        self.guard = threading.Lock()
+        # Loads run one at a time, so the RSS delta can be attributed to a single model and
+        # the same model is never loaded twice. Re-entrant because some loaders build on
+        # other models (e.g. sentiment backends).
+        self.load_lock = threading.RLock()
+        self.warm_up_thread = None
+
+    @classmethod
+    def shared(cls):
+        """The process-wide registry."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def register_loader(self, kind, loader):
+        """Adds or replaces the loader used for models of `kind`."""
+        self.loaders[kind] = loader
+
+    def get(self, kind, model_name):
+        key = (kind, model_name)
+        with self.guard:
+            if key in self.models:
+                return self.models[key]
+
+        # Callers asking for a model that is already loading wait for that load
+        with self.load_lock:
+            if key in self.models:
+                return self.models[key]
+            logging.info(f"Loading {kind} model {model_name}")
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            try:
+                model = self.loaders[kind](model_name)
+            except Exception as e:
+                logging.error(f"Failed to load {kind} model {model_name}: {e}")
+                raise RuntimeError(f"Failed to load {kind} model {model_name}.") from e
+            load_seconds = time.perf_counter() - start
+            rss_after = current_rss_bytes()
+
+            with self.guard:
+                self.models[key] = model
+                self.stats[key] = {
+                    "load_seconds": load_seconds,
+                    "rss_delta_mb": (rss_after - rss_before) / 2 ** 20 if rss_before and rss_after else None,
+                    "rss_after_mb": rss_after / 2 ** 20 if rss_after else None,
+                }
+            logging.info(f"Loaded {kind} model {model_name} in {load_seconds:.1f}s")
+            return model
+
+    def get_embedding_model(self, model_name=DEFAULT_EMBEDDING_MODEL):
+        return self.get("embedding", model_name)
+
+    def get_sentiment_model(self, model_name=DEFAULT_SENTIMENT_MODEL):
+        """Returns (tokenizer, model)."""
+        return self.get("sentiment", model_name)
+
+    def get_sentiment_backend(self, model_name=DEFAULT_SENTIMENT_MODEL, backend="pytorch"):
+        """Returns the inference backend (see scripts.sentiment_backends) for the sentiment model."""
+        kind = f"sentiment-{backend}"
+        with self.guard:
+            if kind not in self.loaders:
+                self.loaders[kind] = lambda name: self.load_sentiment_backend(backend, name)
+        return self.get(kind, model_name)
+
+    def load_sentiment_backend(self, backend, model_name):
+        from scripts.sentiment_backends import create_backend
+        tokenizer, model = self.get_sentiment_model(model_name)
+        return create_backend(backend, model_name, model, tokenizer)
+
+    def is_loaded(self, kind, model_name):
+        with self.guard:
+            return (kind, model_name) in self.models
+
+    def warm_up(self, specs=None):
+        """
+        Loads models on a daemon thread. Failures are only logged; the model is then
+        loaded (and the error raised) on first use instead.
+        :param specs: List of (kind, model name); defaults to the pipeline's imports and models.
+        """
+        if specs is None:
+            specs = [("imports", "pipeline"),
+                     ("embedding", self.DEFAULT_EMBEDDING_MODEL),
+                     ("sentiment", self.DEFAULT_SENTIMENT_MODEL)]
+
+        def run():
+            for kind, model_name in specs:
+                try:
+                    self.get(kind, model_name)
+                except RuntimeError:
+                    pass
+
+        self.warm_up_thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        self.warm_up_thread.start()
+        return self.warm_up_thread
+
+    def get_stats(self):
+        """Load time and resident memory per loaded model, keyed by 'kind:model name'."""
+        with self.guard:
+            return {f"{kind}:{name}": dict(stats) for (kind, name), stats in self.stats.items()}
@@ -0,0 +1,97 @@
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from scripts.Numeric_Analysis_Subsystem import NumericSubsystem
+
+"""
+MultiCoinFetcher loads the market data of a whole watchlist concurrently.
+Each coin goes through NumericSubsystem (and so through the on-disk market
+data cache); all worker threads share the process-wide CoinGecko client, so
+the total request rate stays within the one rate limit. A failing coin is
+recorded in `failures` and does not stop the others.
+"""
+class MultiCoinFetcher:
+    def __init__(self, max_workers=8):
+        """
+        :param max_workers: Coins fetched in parallel. More workers than the rate limit allows
+            only adds waiting; the default covers CoinGecko's latency at 30 requests per minute.
+        """
+        self.max_workers = max_workers
+        self.latencies = {}
+        self.failures = {}
+
+    def fetch_one(self, coin_id, start_datetime, end_datetime):
+        started = time.perf_counter()
+        try:
+            numeric = NumericSubsystem(start_datetime, end_datetime, coin_id)
+            numeric.extract_data()
+            numeric.convert_df()
+            return numeric.get_numeric_data_df()
+        finally:
+            self.latencies[coin_id] = time.perf_counter() - started
+
+    def fetch(self, coin_ids, start_datetime, end_datetime, progress_callback=None):
+        """
+        :return: Long-format DataFrame with one row per coin and sample (see NumericSubsystem),
+            for the coins that succeeded.
+        """
+        self.latencies = {}
+        self.failures = {}
+        coin_ids = list(dict.fromkeys(coin_ids))
+        frames = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="coingecko") as executor:
+            futures = {executor.submit(self.fetch_one, coin_id, start_datetime, end_datetime): coin_id
+                       for coin_id in coin_ids}
+            for done, future in enumerate(as_completed(futures), start=1):
+                coin_id = futures[future]
+                try:
+                    frames[coin_id] = future.result()
+                except Exception as e:
+                    logging.error(f"Market data fetch failed for {coin_id}: {e}")
+                    self.failures[coin_id] = str(e)
+                if progress_callback is not None:
+                    progress_callback("numeric", done, len(futures), f"coins fetched ({len(self.failures)} failed)")
+
+        logging.info(f"Fetched market data for {len(frames)}/{len(coin_ids)} coins; "
+                     f"latency {self.latency_percentiles()}")
+        # Keep the watchlist order
+        ordered = [frames[coin_id] for coin_id in coin_ids if coin_id in frames]
+        return pd.concat(ordered, ignore_index=True) if ordered else pd.DataFrame()
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """Per-coin fetch latency in seconds at the given percentiles, plus the maximum."""
+        if not self.latencies:
+            return {}
+        latencies = np.fromiter(self.latencies.values(), dtype=float)
+        stats = {f"p{p}": float(value) for p, value in zip(percentiles, np.percentile(latencies, percentiles))}
+        stats["max"] = float(latencies.max())
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch CoinGecko market data for a watchlist of coins.")
+    parser.add_argument("coin_ids", nargs="+", help="CoinGecko coin ids, e.g. bitcoin ethereum")
+    parser.add_argument("--days", type=float, default=15, help="Window length ending now")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--output", default="watchlist_market_data.csv")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    end_datetime = datetime.now()
+    fetcher = MultiCoinFetcher(max_workers=args.workers)
+    df = fetcher.fetch(args.coin_ids, end_datetime - timedelta(days=args.days), end_datetime)
+    df.to_csv(args.output, index=False)
+    print(f"{df['Coin Ticker'].nunique() if not df.empty else 0} coins, {len(df)} rows -> {args.output}")
+    print(f"Latency: {fetcher.latency_percentiles()}")
+    for coin_id, error in fetcher.failures.items():
+        print(f"Failed {coin_id}: {error}")
+    return 1 if fetcher.failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
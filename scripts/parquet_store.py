@@ -0,0 +1,124 @@
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+"""
+PartitionedStore accumulates merged analysis output across runs as compressed
+Parquet, partitioned by coin, join mode and post date:
+
+    <root>/coin=<coin id>/join=<date|asof>/date=<YYYY-MM-DD>/part.parquet
+
+The join modes produce differently shaped rows (every price sample of the day
+vs one sample per post), so they never share a partition.
+
+write() merges new rows into the partitions they touch and drops duplicates on
+the key columns (subreddit, post id and price sample by default), so re-running
+the same window does not add rows. Reads and CSV exports only open the
+partitions of the requested coin, join mode and date range.
+"""
+UNKNOWN_DATE = "__unknown__"
+
+
+class PartitionedStore:
+    def __init__(self, root="output_store", key_columns=("subreddit", "id", "Timestamp"), compression="zstd"):
+        """
+        :param key_columns: Columns identifying a row; rows with the same key replace older ones.
+        """
+        self.root = root
+        self.key_columns = list(key_columns)
+        self.compression = compression
+
+    def partition_path(self, coin_id, join, date):
+        return os.path.join(self.root, f"coin={coin_id}", f"join={join}", f"date={date}", "part.parquet")
+
+    def write(self, df, coin_id, join="date", date_column="Date"):
+        """
+        Merges `df` into the coin's partitions. Returns the number of partitions written.
+        :param join: ExportCSV join mode that produced `df`.
+        """
+        missing = [column for column in self.key_columns if column not in df.columns]
+        if missing:
+            # Deduping on a subset of the key would silently collapse distinct rows
+            logging.error(f"Cannot store rows without key columns {missing}")
+            raise RuntimeError(f"Output store rows are missing key columns: {', '.join(missing)}.")
+        if date_column in df:
+            dates = df[date_column].fillna(UNKNOWN_DATE).astype(str)
+        else:
+            dates = pd.Series(UNKNOWN_DATE, index=df.index)
+        written = 0
+        for date, rows in df.groupby(dates, sort=True):
+            path = self.partition_path(coin_id, join, date)
+            if os.path.exists(path):
+                rows = pd.concat([pd.read_parquet(path), rows], ignore_index=True)
+            rows = rows.drop_duplicates(subset=self.key_columns, keep="last").reset_index(drop=True)
+            self.write_partition(path, rows)
+            written += 1
+        logging.info(f"Stored {len(df)} rows for {coin_id} in {written} partitions under {self.root}")
+        return written
+
+    def write_partition(self, path, df):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".parquet.tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, index=False, compression=self.compression)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            logging.error(f"Failed to write partition {path}: {e}")
+            raise RuntimeError("Failed to write the Parquet output store.") from e
+
+    def partitions(self, coin_id=None, start_date=None, end_date=None, join="date"):
+        """
+        Paths of the partitions matching the coin, join mode and inclusive date range
+        (dates as YYYY-MM-DD).
+        """
+        if not os.path.isdir(self.root):
+            return []
+        paths = []
+        for coin_dir in sorted(os.listdir(self.root)):
+            if not coin_dir.startswith("coin=") or (coin_id is not None and coin_dir != f"coin={coin_id}"):
+                continue
+            join_dir = os.path.join(self.root, coin_dir, f"join={join}")
+            if not os.path.isdir(join_dir):
+                continue
+            for date_dir in sorted(os.listdir(join_dir)):
+                date = date_dir[len("date="):]
+                if date != UNKNOWN_DATE and ((start_date and date < str(start_date))
+                                             or (end_date and date > str(end_date))):
+                    continue
+                path = os.path.join(join_dir, date_dir, "part.parquet")
+                if os.path.exists(path):
+                    paths.append(path)
+        return paths
+
+    def read(self, coin_id=None, start_date=None, end_date=None, columns=None, join="date"):
+        frames = [pd.read_parquet(path, columns=columns)
+                  for path in self.partitions(coin_id, start_date, end_date, join)]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    def export_csv(self, filename, coin_id=None, start_date=None, end_date=None, join="date", chunk_rows=50_000):
+        """Writes the matching rows to a CSV, one record batch at a time. Returns the row count."""
+        paths = self.partitions(coin_id, start_date, end_date, join)
+        # Partitions written before a column was added (price horizons, features) lack it:
+        # the header is the union of all partition schemas, in order of first appearance
+        columns = []
+        for path in paths:
+            columns.extend(name for name in pq.read_schema(path).names if name not in columns)
+
+        rows = 0
+        with open(filename, "w", newline="", encoding="utf-8") as csv_file:
+            for path in paths:
+                for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+                    chunk = batch.to_pandas().reindex(columns=columns)
+                    for column in chunk.columns[chunk.dtypes == object]:
+                        chunk[column] = chunk[column].map(
+                            lambda value: value.tolist() if isinstance(value, np.ndarray) else value)
+                    chunk.to_csv(csv_file, index=False, header=rows == 0)
+                    rows += len(chunk)
+        logging.info(f"Exported {rows} rows from {self.root} to {filename}")
+        return rows
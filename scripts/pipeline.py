@@ -0,0 +1,341 @@
+import logging
+import os
+import time
+from datetime import datetime
+from scripts import tracing
+
+
+class AnalysisCancelled(RuntimeError):
+    """Raised inside the pipeline when the user cancels a running analysis."""
+
+
+"""
+AnalysisPipeline chains the SentiMEME-MLysis subsystems
+(numeric -> reddit -> topic -> sentiment -> export) for one
+coin/subreddit window, recording wall time and row counts per stage.
+The outputs of the numeric, reddit, topic and sentiment stages are kept in a
+StageCache, so a rerun with the same inputs (e.g. a retry after a failure in a
+later stage) only runs the stages whose inputs changed. Only a rerun of the exact
+window can hit, so the cache evicts old entries (see StageCache.evict).
+"""
+class AnalysisPipeline:
+    STAGES = ["numeric", "reddit", "topic", "sentiment", "export"]
+
+    def __init__(self, coin_id, subreddit, start_datetime, end_datetime,
+                 keywords=None, output_path="merged_exported_data.csv",
+                 topic_model_name="all-MiniLM-L6-v2", topic_mode="full",
+                 sentiment_model_name="cardiffnlp/twitter-roberta-base-sentiment",
+                 sentiment_backend="pytorch", check_parity=False, use_sentiment_cache=True,
+                 batch_size=64, max_tokens=4096, export_join="date", join_tolerance="1h",
+                 price_horizons=None, market_features=False, store_dir=None, csv_from_store=False,
+                 use_stage_cache=True, stage_cache_dir=None, trace_dir="traces",
+                 streaming=False, stream_batch_size=32, stream_queue_size=256,
+                 progress_callback=None, cancel_event=None):
+        """
+        :param coin_id: CoinGecko coin id (e.g. "bitcoin").
+        :param subreddit: Subreddit name without the "r/" prefix.
+        :param keywords: Keywords to search Reddit for (default: [coin_id]).
+        :param output_path: Where the merged CSV is written.
+        :param topic_mode: "full" (refit BERTopic every run) or "incremental" (reuse the subreddit's saved model).
+        :param sentiment_backend: "pytorch" (fp32), "pytorch-int8" or "onnx".
+        :param check_parity: Compare a non-fp32 backend against fp32 and keep the report in parity_report.
+        :param use_sentiment_cache: Reuse stored sentiment results for texts scored in earlier runs.
+        :param export_join: "date" (every price sample of the post's day) or "asof" (one sample per post).
+        :param join_tolerance: Maximum distance between a post and its price sample for the asof join.
+        :param price_horizons: Horizons (e.g. ["1h", "24h"]) of the post-to-price changes added by the asof join.
+        :param market_features: Add log returns, volatility and volume features to the numeric data.
+        :param store_dir: Also merge the output into the partitioned Parquet store at this path.
+        :param csv_from_store: Write the CSV from the store (all stored rows of the coin on the window's days).
+        :param use_stage_cache: Reuse stage outputs stored by earlier runs with identical inputs.
+        :param stage_cache_dir: Directory of the stage cache (default: cache/stages).
+        :param trace_dir: Directory receiving a JSON lines trace of every run (None disables tracing).
+        :param streaming: Score sentiment while posts are still being fetched (see scripts.streaming).
+        :param stream_batch_size: Posts per sentiment micro-batch in streaming mode.
+        :param stream_queue_size: Capacity of the streaming posts queue.
+        :param progress_callback: Optional callable(stage, done, total, detail) for progress updates.
+        :param cancel_event: Optional threading.Event; when set, the pipeline stops at the next checkpoint.
+        """
+        self.coin_id = coin_id
+        self.subreddit = subreddit
+        self.start_datetime = start_datetime
+        self.end_datetime = end_datetime
+        self.keywords = keywords or [coin_id]
+        self.output_path = output_path
+        self.topic_model_name = topic_model_name
+        self.topic_mode = topic_mode
+        self.sentiment_model_name = sentiment_model_name
+        self.sentiment_backend = sentiment_backend
+        self.check_parity = check_parity
+        self.parity_report = None
+        self.use_sentiment_cache = use_sentiment_cache
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.export_join = export_join
+        self.join_tolerance = join_tolerance
+        self.price_horizons = price_horizons
+        self.market_features = market_features
+        self.store_dir = store_dir
+        self.csv_from_store = csv_from_store and store_dir is not None
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self.stage_cache = None
+        if use_stage_cache:
+            from scripts.stage_cache import StageCache
+            self.stage_cache = StageCache(stage_cache_dir) if stage_cache_dir else StageCache()
+        self.fingerprints = {}
+        self.trace_dir = trace_dir
+        self.trace_path = None
+        self.trace_summary = None
+        self.streaming = streaming
+        self.stream_batch_size = stream_batch_size
+        self.stream_queue_size = stream_queue_size
+
+        self.stage_timings = {}
+        self.warnings = []
+        self.warnings_at_start = 0
+
+    def run(self):
+        """Runs every stage in order and returns the merged DataFrame."""
+        if self.trace_dir is None:
+            return self.run_stages()
+
+        run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{self.coin_id}-{self.subreddit}"
+        self.trace_path = os.path.join(self.trace_dir, f"{run_id}.jsonl")
+        with tracing.Tracer(self.trace_path) as tracer:
+            try:
+                with tracing.span("analysis", coin_id=self.coin_id, subreddit=self.subreddit):
+                    return self.run_stages()
+            finally:
+                self.trace_summary = tracer.format_summary()
+                logging.info(f"Trace written to {self.trace_path}\n{self.trace_summary}")
+                print(self.trace_summary)
+
+    def stage_params(self):
+        """Inputs of each cached stage, with the stages whose output it consumes."""
+        window = {"start": self.start_datetime, "end": self.end_datetime}
+        return {
+            "numeric": (dict(window, coin_id=self.coin_id, features=self.market_features), []),
+            "reddit": (dict(window, subreddit=self.subreddit, keywords=self.keywords), []),
+            "topic": ({"model": self.topic_model_name, "mode": self.topic_mode}, ["reddit"]),
+            "sentiment": ({"model": self.sentiment_model_name, "backend": self.sentiment_backend}, ["topic"]),
+        }
+
+    def run_stages(self):
+        self.warnings_at_start = len(self.warnings)
+        params = self.stage_params()
+        numeric_df = self.cached_stage("numeric", *params["numeric"], self.run_numeric)
+        if self.streaming:
+            sentiment_df = self.run_streaming_stages(params)
+        else:
+            reddit_df = self.cached_stage("reddit", *params["reddit"], self.run_reddit)
+            topic_df = self.cached_stage("topic", *params["topic"], self.run_topic, reddit_df)
+            sentiment_df = self.cached_stage("sentiment", *params["sentiment"], self.run_sentiment, topic_df)
+        # Export is cheap and writes the output file, so it always runs
+        return self.timed_stage("export", self.run_export, sentiment_df, numeric_df)
+
+    def is_cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            logging.info("Analysis cancelled by user.")
+            raise AnalysisCancelled("Analysis cancelled.")
+
+    def report_progress(self, stage, done, total=None, detail=""):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, done, total, detail)
+        # Inner loops report progress often, so they double as cancellation checkpoints
+        self.check_cancelled()
+
+    def timed_stage(self, stage, func, *args):
+        """Runs a single stage, recording its wall time and output row count."""
+        self.check_cancelled()
+        self.report_progress(stage, 0)
+        start = time.perf_counter()
+        with tracing.span(stage) as stage_span:
+            result = func(*args)
+            rows = len(result) if result is not None else 0
+            stage_span.rows = rows
+        seconds = time.perf_counter() - start
+        self.stage_timings[stage] = {"seconds": seconds, "rows": rows}
+        logging.info(f"Stage '{stage}' completed in {seconds:.2f}s ({rows} rows)")
+        return result
+
+    def cached_stage(self, stage, params, upstream, func, *args):
+        """
+        Runs a stage through the stage cache.
+        :param upstream: Names of the earlier stages whose output the stage consumes.
+        """
+        if self.stage_cache is None:
+            return self.timed_stage(stage, func, *args)
+
+        from scripts.stage_cache import StageCache
+        fingerprint = StageCache.fingerprint(stage, params, [self.fingerprints[name] for name in upstream])
+        self.fingerprints[stage] = fingerprint
+
+        self.check_cancelled()
+        cached = self.stage_cache.load(stage, fingerprint)
+        if cached is not None:
+            self.stage_timings[stage] = {"seconds": 0.0, "rows": len(cached), "cached": True}
+            self.report_progress(stage, len(cached), len(cached), "loaded from cache")
+            return cached
+
+        result = self.timed_stage(stage, func, *args)
+        # Nothing is cached once a stage has fallen back in this run (e.g. topic modelling failed):
+        # the fallback is not part of the fingerprints, so every later stage built on it would
+        # otherwise be reused by the retry that the fallback stage is meant to get
+        if result is not None and len(self.warnings) == self.warnings_at_start:
+            self.stage_cache.save(stage, fingerprint, result)
+        return result
+
+    def run_streaming_stages(self, params):
+        """
+        Reddit, topic and sentiment in streaming mode: posts are scored in micro-batches while
+        they are fetched, then topics are assigned on the accumulated posts and the outliers
+        are filtered out as in run_topic(). The parity check, if requested, runs on the
+        collected posts after the stream. The three outputs are stored under the same stage
+        cache keys as in sequential mode, so either mode reuses the other's results.
+        """
+        if self.stage_cache is not None:
+            from scripts.stage_cache import StageCache
+            for stage in ("reddit", "topic", "sentiment"):
+                stage_params, upstream = params[stage]
+                self.fingerprints[stage] = StageCache.fingerprint(
+                    stage, stage_params, [self.fingerprints[name] for name in upstream])
+            self.check_cancelled()
+            cached = self.stage_cache.load("sentiment", self.fingerprints["sentiment"])
+            if cached is not None:
+                self.stage_timings["sentiment"] = {"seconds": 0.0, "rows": len(cached), "cached": True}
+                self.report_progress("sentiment", len(cached), len(cached), "loaded from cache")
+                return cached
+
+        import pandas as pd
+        from scripts.reddit_api_fetch import RedditAPI
+        from scripts.sentiment_analysis import RedditSentimentAnalysis
+        from scripts.sentiment_cache import SentimentCache
+        from scripts.streaming import PostStream
+
+        self.check_cancelled()
+        cache = SentimentCache() if self.use_sentiment_cache else None
+        try:
+            sentiment_analysis = RedditSentimentAnalysis(pd.DataFrame(columns=["comments"]),
+                                                         model_name=self.sentiment_model_name,
+                                                         backend=self.sentiment_backend, cache=cache)
+            sentiment_analysis.initialize_model()
+            stream = PostStream(lambda: RedditAPI(self.subreddit, self.keywords, self.start_datetime,
+                                                  self.end_datetime),
+                                sentiment_analysis, micro_batch_size=self.stream_batch_size,
+                                queue_size=self.stream_queue_size, batch_size=self.batch_size,
+                                max_tokens=self.max_tokens, progress_callback=self.report_progress,
+                                cancel_event=self.cancel_event)
+            self.report_progress("reddit", 0, None, "streaming")
+            start = time.perf_counter()
+            with tracing.span("stream") as stream_span:
+                reddit_df, scores_df = stream.run()
+                stream_span.rows = len(reddit_df)
+        finally:
+            if cache is not None:
+                cache.close()
+        # Reddit I/O and inference overlapped: the reddit stage is charged the whole stream,
+        # the sentiment stage only the inference time spent inside it
+        self.stage_timings["reddit"] = {"seconds": time.perf_counter() - start, "rows": len(reddit_df),
+                                        "streamed": True}
+        self.stage_timings["sentiment"] = {"seconds": stream.stats["inference_seconds"],
+                                           "rows": len(scores_df), "streamed": True}
+        logging.info(f"Streaming completed: {stream.stats}, comments: {stream.comment_stats}")
+
+        topic_df = self.timed_stage("topic", self.run_topic, reddit_df)
+        sentiment_analysis.df = topic_df.merge(scores_df, on="id", how="left")
+        if self.check_parity and self.sentiment_backend != "pytorch":
+            # The texts are only all in once the stream has finished
+            self.parity_report = sentiment_analysis.check_backend_parity()
+            logging.info(f"Sentiment backend parity: {self.parity_report}")
+        sentiment_analysis.finalize_sentiment_dataframe()
+        sentiment_df = sentiment_analysis.get_sentiment_dataframe()
+        logging.info("Text Analysis Completed!")
+
+        if self.stage_cache is not None and len(self.warnings) == self.warnings_at_start:
+            for stage, result in (("reddit", reddit_df), ("topic", topic_df), ("sentiment", sentiment_df)):
+                self.stage_cache.save(stage, self.fingerprints[stage], result)
+        return sentiment_df
+
+    def run_numeric(self):
+        from scripts.Numeric_Analysis_Subsystem import NumericSubsystem
+        number_analysis = NumericSubsystem(self.start_datetime, self.end_datetime, self.coin_id)
+        number_analysis.extract_data()
+        number_analysis.convert_df()
+        logging.info("Numeric Analysis Completed!")
+        if self.market_features:
+            return number_analysis.get_market_features()
+        return number_analysis.get_numeric_data_df()
+
+    def run_reddit(self):
+        from scripts.reddit_api_fetch import RedditAPI
+        reddit_api = RedditAPI(self.subreddit, self.keywords, self.start_datetime, self.end_datetime)
+        return reddit_api.search_subreddit(progress_callback=self.report_progress)
+
+    def run_topic(self, reddit_df):
+        try:
+            from scripts.topic_model import RedditTopicModel
+            from scripts.embedding_store import EmbeddingStore
+            embedding_store = EmbeddingStore(self.topic_model_name)
+            try:
+                topic_model = RedditTopicModel(reddit_df, model_name=self.topic_model_name,
+                                               embedding_store=embedding_store, mode=self.topic_mode,
+                                               subreddit=self.subreddit)
+                topic_model.initialize_model()
+                topic_model.fit_transform(progress_callback=self.report_progress)
+                topic_model.process_topics()
+                topic_df = topic_model.get_topic_dataframe()
+            finally:
+                embedding_store.close()
+            logging.info("Topic Modelling Completed!")
+            return topic_df
+
+        except AnalysisCancelled:
+            raise
+
+        except Exception as topic_error:
+            # Topic modelling needs a minimum number of posts; fall back to sentiment only
+            logging.error(f"Topic modelling failed: {topic_error}")
+            self.warnings.append("Topic modelling failed due to insufficient posts. "
+                                 "Proceeding with sentiment analysis only.")
+            topic_df = reddit_df.copy()
+            topic_df["topic"] = -1
+            return topic_df
+
+    def run_sentiment(self, topic_df):
+        from scripts.sentiment_analysis import RedditSentimentAnalysis
+        from scripts.sentiment_cache import SentimentCache
+        cache = SentimentCache() if self.use_sentiment_cache else None
+        sentiment_analysis = RedditSentimentAnalysis(topic_df, model_name=self.sentiment_model_name,
+                                                     backend=self.sentiment_backend, cache=cache)
+        try:
+            sentiment_analysis.initialize_model()
+            if self.check_parity and self.sentiment_backend != "pytorch":
+                self.parity_report = sentiment_analysis.check_backend_parity()
+                logging.info(f"Sentiment backend parity: {self.parity_report}")
+            sentiment_analysis.analyze_sentiment(batch_size=self.batch_size, max_tokens=self.max_tokens,
+                                                 progress_callback=self.report_progress)
+        finally:
+            if cache is not None:
+                cache.close()
+        sentiment_analysis.finalize_sentiment_dataframe()
+        logging.info("Text Analysis Completed!")
+        return sentiment_analysis.get_sentiment_dataframe()
+
+    def run_export(self, sentiment_df, numeric_df):
+        from scripts.export_csv import ExportCSV
+        # Jobs for the same coin in different subreddits share the store's partitions
+        sentiment_df = sentiment_df.assign(subreddit=self.subreddit)
+        merged_df = ExportCSV(df_text=sentiment_df, df_num=numeric_df, filename=self.output_path,
+                              join=self.export_join, tolerance=self.join_tolerance,
+                              price_horizons=self.price_horizons, write_csv=not self.csv_from_store).df
+        if self.store_dir is not None:
+            from scripts.parquet_store import PartitionedStore
+            store = PartitionedStore(self.store_dir)
+            store.write(merged_df, self.coin_id, join=self.export_join)
+            if self.csv_from_store:
+                store.export_csv(self.output_path, self.coin_id, self.start_datetime.date().isoformat(),
+                                 self.end_datetime.date().isoformat(), join=self.export_join)
+        return merged_df
@@ -0,0 +1,77 @@
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+"""
+RangePlanner keeps CoinGecko market_chart data at hourly resolution over long
+windows. market_chart/range returns 5-minute data for ranges up to a day,
+hourly data up to 90 days and daily data beyond that, so:
+
+    plan()            splits a range into equal chunks of 1 to 90 days
+    fetch()           fetches the chunks in parallel (the shared client applies the rate limit)
+    continuity_gaps() finds holes in a stitched series
+    regularize()      snaps a series onto an even grid, e.g. one point per hour
+"""
+DAY = 24 * 3600
+
+
+class RangePlanner:
+    def __init__(self, max_chunk_days=90, min_chunk_days=1, max_workers=4):
+        self.max_chunk_seconds = max_chunk_days * DAY
+        self.min_chunk_seconds = min_chunk_days * DAY
+        self.max_workers = max_workers
+
+    def plan(self, start, end):
+        """Splits [start, end] (unix seconds) into the fewest equal chunks of at most max_chunk_days."""
+        span = end - start
+        if span <= 0:
+            return []
+        count = max(1, math.ceil(span / self.max_chunk_seconds))
+        step = span / count
+        if span > self.min_chunk_seconds and step < self.min_chunk_seconds:
+            # Never produce chunks short enough to come back at 5-minute resolution
+            count = max(1, int(span // self.min_chunk_seconds))
+            step = span / count
+        return [[start + i * step, end if i == count - 1 else start + (i + 1) * step] for i in range(count)]
+
+    def fetch(self, chunks, fetch_chunk):
+        """
+        Calls fetch_chunk(start, end) for every chunk in parallel.
+        :return: List of (chunk, result or None, exception or None) in chunk order.
+        """
+        def run(chunk):
+            try:
+                return chunk, fetch_chunk(*chunk), None
+            except Exception as e:
+                logging.error(f"Fetching range {chunk[0]:.0f}-{chunk[1]:.0f} failed: {e}")
+                return chunk, None, e
+
+        if len(chunks) == 1:
+            return [run(chunks[0])]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="range-chunk") as executor:
+            return list(executor.map(run, chunks))
+
+    @staticmethod
+    def continuity_gaps(series, interval_seconds=3600, tolerance=1.5):
+        """[[from_ms, to_ms], ...] between consecutive points further apart than tolerance * interval."""
+        limit = interval_seconds * 1000 * tolerance
+        return [[previous[0], current[0]] for previous, current in zip(series, series[1:])
+                if current[0] - previous[0] > limit]
+
+    @staticmethod
+    def regularize(series, interval_seconds=3600, max_fill=3):
+        """
+        Snaps a [[ms, value], ...] series onto an even grid: the last point in each interval
+        is kept, and up to `max_fill` empty intervals in a row are filled with the previous
+        value. Longer holes are left out.
+        """
+        if not series:
+            return []
+        interval_ms = interval_seconds * 1000
+        df = pd.DataFrame(series, columns=["ms", "value"])
+        df["slot"] = df["ms"] // interval_ms * interval_ms
+        values = df.groupby("slot")["value"].last()
+        grid = range(int(values.index[0]), int(values.index[-1]) + interval_ms, interval_ms)
+        values = values.reindex(grid).ffill(limit=max_fill).dropna()
+        return [[int(ms), value] for ms, value in values.items()]
@@ -3,16 +3,30 @@ import praw
 import pandas as pd
 import time
 import logging
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 import prawcore
+from scripts import tracing
+from scripts.comment_fetcher import CommentFetcher
+from scripts.reddit_store import RedditPostStore
 
 class RedditAPI:
-    def __init__(self, subreddit: str, coin_ticker: list, start_datetime: datetime, end_datetime: datetime):
+    SHORT_KEYWORD_LENGTH = 4  # keywords this short are matched as whole words only
+    LISTING_PAGE_SIZE = 100  # posts PRAW requests per listing page
+    COMMENT_REQUESTS_PER_MINUTE = 90  # shared comment hydration budget (Reddit OAuth allows 100)
+    INFO_BATCH_SIZE = 100  # fullnames per /api/info request
+
+    def __init__(self, subreddit: str, coin_ticker: list, start_datetime: datetime, end_datetime: datetime,
+                 comment_workers: int = 4, store: RedditPostStore = None):
         self.subreddit_name = subreddit
         self.coin_ticker = coin_ticker
         self.start_datetime = datetime.timestamp(start_datetime)
         self.end_datetime = datetime.timestamp(end_datetime)
+        self.comment_workers = comment_workers
+        self.comment_stats = {}
+        self.store = store if store is not None else RedditPostStore()
         self.reddit = self.create_reddit_instance()
         self.subreddit = self.reddit.subreddit(self.subreddit_name)
 
@@ -33,76 +47,295 @@ class RedditAPI:
             logging.error(f"Failed to authenticate Reddit API: {e}")
             raise RuntimeError("Failed to authenticate Reddit API.") from e
 
-    def search_subreddit(self):
-        """Retrieve posts from the subreddit and filter them based on keywords and time range."""
+    def build_keyword_pattern(self):
+        """
+        Compiles every keyword/alias into one case-insensitive pattern so each post is checked once.
+        Short aliases (usually symbols like "eth") must stand alone so they don't match inside words.
+        """
+        keywords = []
+        for keyword in self.coin_ticker:
+            if not isinstance(keyword, str) or len(keyword.strip()) == 0:
+                logging.warning(f"Skipping invalid keyword: {keyword}")
+                continue
+            if keyword.strip().lower() not in keywords:
+                keywords.append(keyword.strip().lower())
+
+        # Longest first so the alternation prefers the most specific alias
+        parts = []
+        for keyword in sorted(keywords, key=len, reverse=True):
+            escaped = re.escape(keyword)
+            parts.append(rf"(?<!\w){escaped}(?!\w)" if len(keyword) <= self.SHORT_KEYWORD_LENGTH else escaped)
+        return re.compile("|".join(parts), re.IGNORECASE)
+
+    def iter_new_posts(self, limit=1000):
+        """
+        Streams the subreddit's /new listing page by page, one listing request per page. On
+        transient API errors the listing is resumed after the last post already yielded
+        instead of starting over.
+        """
+        fetched = 0
+        after = None
+        retry_attempts = 3
+        attempt = 0
+        page_number = 0
+
+        while fetched < limit:
+            page_size = min(self.LISTING_PAGE_SIZE, limit - fetched)
+            try:
+                params = {"after": after} if after else {}
+                # A limit of at most one page is a single request, so the span covers exactly one call
+                with tracing.span("reddit.listing_page", page=page_number) as page_span:
+                    tracing.count_api_call("reddit")
+                    page = list(self.subreddit.new(limit=page_size, params=params))
+                    page_span.rows = len(page)
+            except prawcore.exceptions.BadRequest:
+                logging.error(f"Bad request error for subreddit '{self.subreddit_name}'.")
+                raise RuntimeError(f"Bad request error for subreddit '{self.subreddit_name}'.")  # ✅ Raise
+            except prawcore.exceptions.RequestException as e:
+                attempt += 1
+                logging.error(f"API request failed (Attempt {attempt}/{retry_attempts}): {e}")
+                if attempt >= retry_attempts:
+                    raise RuntimeError(f"Reddit API request failed: {e}") from e
+                time.sleep(10)
+                continue
+            except prawcore.exceptions.TooManyRequests as e:
+                attempt += 1
+                logging.error(f"Rate limit exceeded. Waiting: {e}")
+                if attempt >= retry_attempts:
+                    raise RuntimeError(f"Reddit API rate limit exceeded: {e}") from e
+                time.sleep(30)
+                continue
+            except Exception as e:
+                logging.error(f"Unexpected error: {e}")
+                raise RuntimeError(f"Please try another subreddit")
+
+            attempt = 0
+            page_number += 1
+            for post in page:
+                fetched += 1
+                after = post.fullname
+                yield post
+            if len(page) < page_size:
+                # End of the listing
+                return
+
+    def sync_store(self, progress_callback=None):
+        """
+        Pulls posts newer than the store's high-water mark from the /new listing into the
+        local store. Paging stops at the high-water mark, or at the window start when the
+        window reaches further back than the store's gap-free history.
+        """
+        for _ in self.iter_sync_pages(progress_callback):
+            pass
+
+    def iter_sync_pages(self, progress_callback=None):
+        """
+        sync_store() one listing page at a time: each page of new posts is stored and then
+        yielded, so callers can start on it while the next page is fetched. The sync state
+        is only advanced once the listing has been read to the end.
+        """
+        state = self.store.get_sync_state(self.subreddit_name)
+        if state is not None and state[0] <= self.start_datetime:
+            stop_timestamp = state[1]
+        else:
+            stop_timestamp = self.start_datetime
+
+        new_posts = []
+        page = []
+        reached_stop = False
+        for post in self.iter_new_posts():
+            if post.created_utc <= stop_timestamp:
+                # /new is newest first, so every remaining post is already stored or out of the window
+                reached_stop = True
+                break
+            new_posts.append(post)
+            page.append(post)
+            if progress_callback is not None:
+                progress_callback("reddit", len(new_posts), None, "new posts fetched")
+            if len(page) == self.LISTING_PAGE_SIZE:
+                self.store.upsert_posts(self.subreddit_name, page)
+                yield page
+                page = []
+        if page:
+            self.store.upsert_posts(self.subreddit_name, page)
+            yield page
+        logging.info(f"Synced {len(new_posts)} new posts from r/{self.subreddit_name}.")
+
+        # Track the span the store now covers without gaps
+        newest = max((post.created_utc for post in new_posts), default=None)
+        if reached_stop:
+            # Contiguous with what was stored before, or a fresh span back to the window start
+            low_water = state[0] if stop_timestamp != self.start_datetime else self.start_datetime
+            high_water = max(newest or stop_timestamp, state[1] if state is not None else stop_timestamp)
+        elif new_posts:
+            # Listing cap hit before reaching stored history: only the fetched span is gap-free
+            low_water = min(post.created_utc for post in new_posts)
+            high_water = newest
+        else:
+            return
+        self.store.update_sync_state(self.subreddit_name, low_water, high_water)
+
+    def refresh_votes(self, posts):
+        """
+        Re-reads the score, ups and upvote ratio of stored posts whose counts went stale (see
+        RedditPostStore.posts_needing_votes), in batched /api/info requests, and updates both
+        the store and the given post dicts. On failure the stored counts are kept.
+        """
+        stale_ids = self.store.posts_needing_votes(posts)
+        if not stale_ids:
+            return
+        submissions = []
+        for i in range(0, len(stale_ids), self.INFO_BATCH_SIZE):
+            fullnames = [f"t3_{post_id}" for post_id in stale_ids[i:i + self.INFO_BATCH_SIZE]]
+            try:
+                tracing.count_api_call("reddit")
+                submissions.extend(self.reddit.info(fullnames=fullnames))
+            except Exception as e:
+                logging.warning(f"Failed to refresh vote counts of {len(fullnames)} posts: {e}")
+        self.store.update_votes(submissions)
+
+        by_id = {submission.id: submission for submission in submissions}
+        for post in posts:
+            submission = by_id.get(post["id"])
+            if submission is not None:
+                for column in ("upvote_ratio", "ups", "downs", "score"):
+                    post[column] = getattr(submission, column, 0)
+        logging.info(f"Refreshed vote counts of {len(submissions)} of {len(stale_ids)} stale posts.")
+
+    def search_subreddit(self, progress_callback=None):
+        """
+        Retrieve posts from the subreddit and filter them based on keywords and time range.
+        New posts are synced into the local store first; the time-window query and keyword
+        matching are then answered from the store, and comments and vote counts are only
+        fetched for matched posts that were never hydrated or were still changing when last read.
+        :param progress_callback: Optional callable(stage, done, total, detail) reporting scan progress.
+        """
         search_results = []
-        start_timestamp = self.start_datetime
-        end_timestamp = self.end_datetime
 
         if not self.coin_ticker or all(not keyword.strip() for keyword in self.coin_ticker):
             logging.error("No valid keywords provided.")
             raise ValueError("No valid keywords provided.")
 
-        for keyword in self.coin_ticker:
-            posts = []
+        keyword_pattern = self.build_keyword_pattern()
+        logging.info(f"Fetching latest posts in r/{self.subreddit_name} for keywords: {self.coin_ticker}")
 
-            try:
-                if not isinstance(keyword, str) or len(keyword.strip()) == 0:
-                    logging.warning(f"Skipping invalid keyword: {keyword}")
-                    continue
-
-                logging.info(f"Fetching latest posts in r/{self.subreddit_name} for keyword: {keyword}")
-
-                retry_attempts = 3
-                for attempt in range(retry_attempts):
-                    try:
-                        posts = list(self.subreddit.new(limit=1000))
-                        if not posts:
-                            logging.warning(f"No results for '{keyword}' in r/{self.subreddit_name}.")
-                        break
-                    except prawcore.exceptions.BadRequest:
-                        logging.error(f"Bad request error for subreddit '{self.subreddit_name}'.")
-                        raise RuntimeError(f"Bad request error for subreddit '{self.subreddit_name}'.")  # ✅ Raise
-                    except prawcore.exceptions.RequestException as e:
-                        logging.error(f"API request failed (Attempt {attempt+1}/{retry_attempts}): {e}")
-                        time.sleep(10)
-                    except prawcore.exceptions.TooManyRequests as e:
-                        logging.error(f"Rate limit exceeded. Waiting: {e}")
-                        time.sleep(30)
-                    except Exception as e:
-                        logging.error(f"Unexpected error: {e}")
-                        raise RuntimeError(f"Please try another subreddit")
-
-                for post in posts:
-                    post_timestamp = post.created_utc
-
-                    if start_timestamp <= post_timestamp <= end_timestamp and keyword.lower() in post.title.lower():
-                        try:
-                            post.comments.replace_more(limit=0)
-                            top_comments = [comment.body for comment in post.comments[:5]]
-                        except Exception as e:
-                            logging.error(f"Failed to fetch comments for post {post.id}: {e}")
-                            raise RuntimeError(f"Failed to fetch comments for post {post.id}: {e}")
-
-                        search_results.append({
-                            'id': post.id,
-                            'title': post.title,
-                            'selftext': getattr(post, 'selftext', ''),
-                            'created': datetime.fromtimestamp(post_timestamp, tz=timezone.utc).astimezone(timezone(timedelta(hours=8))),
-                            'upvote_ratio': getattr(post, 'upvote_ratio', 0),
-                            'ups': getattr(post, 'ups', 0),
-                            'downs': getattr(post, 'downs', 0),
-                            'score': getattr(post, 'score', 0),
-                            'comments': top_comments,
-                            'url': f"https://www.reddit.com{post.permalink}"
-                        })
+        self.sync_store(progress_callback)
 
-            except Exception as e:
-                logging.error(f"Error searching subreddit for keyword '{keyword}': {e}")
-                raise
+        window_posts = self.store.query_window(self.subreddit_name, self.start_datetime, self.end_datetime)
+        matched_posts = [post for post in window_posts
+                         if keyword_pattern.search(post["title"] or "") or keyword_pattern.search(post["selftext"] or "")]
+        logging.info(f"{len(matched_posts)} of {len(window_posts)} stored posts in the window matched.")
+        self.refresh_votes(matched_posts)
+
+        # Hydrate comments concurrently; a post whose comments fail is kept with no comments
+        stale_ids = self.store.posts_needing_comments(matched_posts)
+        comment_fetcher = CommentFetcher(self.create_reddit_instance, max_workers=self.comment_workers,
+                                         requests_per_minute=self.COMMENT_REQUESTS_PER_MINUTE)
+        self.store.save_comments(comment_fetcher.fetch_all(stale_ids, progress_callback))
+        self.comment_stats = comment_fetcher.get_counts()
+
+        comments_by_id = self.store.get_comments([post["id"] for post in matched_posts])
+        for post in matched_posts:
+            search_results.append(self.post_record(post, comments_by_id.get(post["id"], [])))
 
         df = pd.DataFrame(search_results)
         if df.empty:
             logging.error("No reddit posts matched the given criteria.")
             raise RuntimeError("No reddit posts matched the given criteria.")
         return df
+
+    def stream_posts(self, max_pending=256):
+        """
+        search_subreddit() as a generator of post records (see post_record), for the streaming
+        pipeline. Matched posts of each synced listing page are handed to the comment workers
+        while the next page is fetched, and every post is yielded as soon as its comments are
+        in, so records arrive in completion order. At most `max_pending` posts wait for
+        comments at a time; beyond that the generator blocks until some are hydrated.
+        """
+        if not self.coin_ticker or all(not keyword.strip() for keyword in self.coin_ticker):
+            logging.error("No valid keywords provided.")
+            raise ValueError("No valid keywords provided.")
+
+        keyword_pattern = self.build_keyword_pattern()
+        logging.info(f"Streaming posts in r/{self.subreddit_name} for keywords: {self.coin_ticker}")
+
+        comment_fetcher = CommentFetcher(self.create_reddit_instance, max_workers=self.comment_workers,
+                                         requests_per_minute=self.COMMENT_REQUESTS_PER_MINUTE)
+        executor = ThreadPoolExecutor(max_workers=self.comment_workers, thread_name_prefix="reddit-comments")
+        pending = {}  # future -> stored post waiting for its comments
+        seen = set()
+
+        def start(window_posts):
+            matched_posts = [post for post in window_posts if post["id"] not in seen and (
+                keyword_pattern.search(post["title"] or "") or keyword_pattern.search(post["selftext"] or ""))]
+            seen.update(post["id"] for post in matched_posts)
+            self.refresh_votes(matched_posts)
+            stale_ids = set(self.store.posts_needing_comments(matched_posts))
+            fresh_posts = [post for post in matched_posts if post["id"] not in stale_ids]
+            comments_by_id = self.store.get_comments([post["id"] for post in fresh_posts])
+            for post in matched_posts:
+                if post["id"] in stale_ids:
+                    pending[executor.submit(comment_fetcher.fetch_one, post["id"])] = post
+            return [self.post_record(post, comments_by_id[post["id"]]) for post in fresh_posts]
+
+        try:
+            for page in self.iter_sync_pages():
+                page_start = max(self.start_datetime, min(post.created_utc for post in page))
+                page_end = min(self.end_datetime, max(post.created_utc for post in page))
+                if page_start <= page_end:
+                    yield from start(self.store.query_window(self.subreddit_name, page_start, page_end))
+                yield from self.collect_comments(pending, max_pending)
+
+            # Posts stored by earlier runs that the listing did not return again
+            yield from start(self.store.query_window(self.subreddit_name, self.start_datetime, self.end_datetime))
+            yield from self.collect_comments(pending, 0)
+        finally:
+            # On early exit (error or cancellation), drop posts that have not started yet
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.comment_stats = comment_fetcher.get_counts()
+        logging.info(f"Streamed {len(seen)} matched posts. Comment hydration: {self.comment_stats}")
+
+    def collect_comments(self, pending, max_pending):
+        """
+        Stores the comments of finished hydrations and yields their post records. Blocks
+        while more than `max_pending` posts are in flight. A post whose comments failed is
+        yielded with whatever comments were stored before.
+        """
+        while pending:
+            block = len(pending) > max_pending
+            done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            if not done:
+                return
+            posts = []
+            comments_by_id = {}
+            for future in done:
+                post = pending.pop(future)
+                posts.append(post)
+                try:
+                    comments_by_id[post["id"]] = future.result()
+                except Exception as e:
+                    # Same as CommentFetcher.fetch_all: the post is kept with its stored comments
+                    logging.error(f"Comment fetch for post {post['id']} failed: {e}")
+                    comments_by_id[post["id"]] = None
+            self.store.save_comments({post_id: comments for post_id, comments in comments_by_id.items()
+                                      if comments is not None})
+            failed = self.store.get_comments([post_id for post_id, comments in comments_by_id.items()
+                                              if comments is None])
+            for post in posts:
+                yield self.post_record(post, comments_by_id[post["id"]] or failed.get(post["id"], []))
+
+    @staticmethod
+    def post_record(post, top_comments):
+        """Builds an output row from a stored post (see RedditPostStore.POST_COLUMNS)."""
+        return {
+            'id': post['id'],
+            'title': post['title'],
+            'selftext': post['selftext'] or '',
+            'created': datetime.fromtimestamp(post['created_utc'], tz=timezone.utc).astimezone(timezone(timedelta(hours=8))),
+            'upvote_ratio': post['upvote_ratio'] or 0,
+            'ups': post['ups'] or 0,
+            'downs': post['downs'] or 0,
+            'score': post['score'] or 0,
+            'comments': top_comments,
+            'url': f"https://www.reddit.com{post['permalink']}"
+        }
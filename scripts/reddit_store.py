@@ -0,0 +1,166 @@
+import logging
+import os
+import sqlite3
+import time
+from scripts.sqlite_util import select_in
+
+"""
+RedditPostStore is a local SQLite archive of subreddit posts and their top
+comments. Every post seen in a /new listing is kept (not only the ones that
+matched a keyword), so later analyses of the same subreddit can be answered
+from disk and history accumulates beyond Reddit's 1000-item listing cap.
+
+Per subreddit, sync_state records the span [low_water_utc, high_water_utc]
+that the store holds without gaps; only posts newer than high_water_utc
+have to be fetched from Reddit again.
+"""
+class RedditPostStore:
+    POST_COLUMNS = ["id", "subreddit", "title", "selftext", "created_utc", "upvote_ratio",
+                    "ups", "downs", "score", "permalink", "fetched_at", "comments_refreshed_at"]
+
+    def __init__(self, db_path=os.path.join("cache", "reddit_store.sqlite")):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        try:
+            self.conn = sqlite3.connect(db_path)
+            self.conn.row_factory = sqlite3.Row
+            self.create_tables()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open Reddit store {db_path}: {e}")
+            raise RuntimeError("Failed to open local Reddit store.") from e
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id TEXT PRIMARY KEY,
+                    subreddit TEXT NOT NULL,
+                    title TEXT,
+                    selftext TEXT,
+                    created_utc REAL NOT NULL,
+                    upvote_ratio REAL,
+                    ups INTEGER,
+                    downs INTEGER,
+                    score INTEGER,
+                    permalink TEXT,
+                    fetched_at REAL,
+                    comments_refreshed_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_posts_subreddit_created
+                    ON posts (subreddit, created_utc);
+                CREATE TABLE IF NOT EXISTS comments (
+                    post_id TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    body TEXT,
+                    PRIMARY KEY (post_id, rank)
+                );
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    subreddit TEXT PRIMARY KEY,
+                    low_water_utc REAL,
+                    high_water_utc REAL,
+                    last_sync_at REAL
+                );
+            """)
+
+    def close(self):
+        self.conn.close()
+
+    def get_sync_state(self, subreddit):
+        """Returns (low_water_utc, high_water_utc) for the subreddit, or None if never synced."""
+        row = self.conn.execute(
+            "SELECT low_water_utc, high_water_utc FROM sync_state WHERE subreddit = ?",
+            (subreddit.lower(),)).fetchone()
+        return (row["low_water_utc"], row["high_water_utc"]) if row else None
+
+    def update_sync_state(self, subreddit, low_water_utc, high_water_utc):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (subreddit, low_water_utc, high_water_utc, last_sync_at) "
+                "VALUES (?, ?, ?, ?)",
+                (subreddit.lower(), low_water_utc, high_water_utc, time.time()))
+
+    def upsert_posts(self, subreddit, posts):
+        """Inserts listing posts, refreshing vote counts of posts already stored."""
+        now = time.time()
+        rows = [(
+            post.id, subreddit.lower(), post.title, getattr(post, 'selftext', '') or '', post.created_utc,
+            getattr(post, 'upvote_ratio', 0), getattr(post, 'ups', 0), getattr(post, 'downs', 0),
+            getattr(post, 'score', 0), post.permalink, now,
+        ) for post in posts]
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO posts (id, subreddit, title, selftext, created_utc, upvote_ratio,
+                                   ups, downs, score, permalink, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    title = excluded.title, selftext = excluded.selftext,
+                    upvote_ratio = excluded.upvote_ratio, ups = excluded.ups, downs = excluded.downs,
+                    score = excluded.score, fetched_at = excluded.fetched_at
+            """, rows)
+
+    def query_window(self, subreddit, start_utc, end_utc):
+        """Posts of the subreddit created within [start_utc, end_utc], newest first."""
+        return [dict(row) for row in self.conn.execute(
+            "SELECT * FROM posts WHERE subreddit = ? AND created_utc BETWEEN ? AND ? "
+            "ORDER BY created_utc DESC",
+            (subreddit.lower(), start_utc, end_utc))]
+
+    @staticmethod
+    def is_stale(post, refreshed, now, recent_seconds, ttl_seconds):
+        """
+        True once `ttl_seconds` have passed since `refreshed`, if the post was younger than
+        `recent_seconds` at that refresh. Judging by the post's age at the last refresh (not
+        now) means every thread is refreshed at least once after it settles.
+        """
+        return refreshed - post["created_utc"] < recent_seconds and now - refreshed > ttl_seconds
+
+    def posts_needing_comments(self, posts, recent_seconds=2 * 24 * 3600, ttl_seconds=3600):
+        """
+        Picks the posts whose comments should be (re)fetched: posts never hydrated, and
+        posts whose comments went stale (see is_stale). Settled threads rarely change,
+        so their stored comments are reused as-is.
+        """
+        now = time.time()
+        stale = []
+        for post in posts:
+            refreshed = post["comments_refreshed_at"]
+            if refreshed is None or self.is_stale(post, refreshed, now, recent_seconds, ttl_seconds):
+                stale.append(post["id"])
+        return stale
+
+    def posts_needing_votes(self, posts, recent_seconds=2 * 24 * 3600, ttl_seconds=3600):
+        """
+        Picks the posts whose vote counts should be re-read: the listing sync stops at the
+        high-water mark, so a post's score is otherwise frozen at the time it was first stored.
+        """
+        now = time.time()
+        return [post["id"] for post in posts
+                if self.is_stale(post, post["fetched_at"] or post["created_utc"], now, recent_seconds, ttl_seconds)]
+
+    def update_votes(self, posts):
+        """Stores the current vote counts of PRAW submissions already in the store."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE posts SET upvote_ratio = ?, ups = ?, downs = ?, score = ?, fetched_at = ? WHERE id = ?",
+                [(getattr(post, 'upvote_ratio', 0), getattr(post, 'ups', 0), getattr(post, 'downs', 0),
+                  getattr(post, 'score', 0), now, post.id) for post in posts])
+
+    def save_comments(self, comments_by_id):
+        now = time.time()
+        with self.conn:
+            for post_id, comments in comments_by_id.items():
+                self.conn.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
+                self.conn.executemany(
+                    "INSERT INTO comments (post_id, rank, body) VALUES (?, ?, ?)",
+                    [(post_id, rank, body) for rank, body in enumerate(comments)])
+                self.conn.execute("UPDATE posts SET comments_refreshed_at = ? WHERE id = ?", (now, post_id))
+
+    def get_comments(self, post_ids):
+        """Returns a dict of post id -> stored comment bodies in rank order."""
+        comments = {post_id: [] for post_id in post_ids}
+        for row in select_in(self.conn, "SELECT post_id, body FROM comments WHERE post_id IN ({placeholders}) "
+                                        "ORDER BY post_id, rank", comments):
+            comments[row["post_id"]].append(row["body"])
+        return comments
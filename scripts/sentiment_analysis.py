@@ -1,68 +1,183 @@
+import logging
+import time
 import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import pandas as pd
+from scripts import tracing
+from scripts.model_registry import ModelRegistry
+from scripts.sentiment_backends import create_backend
 
 class RedditSentimentAnalysis:
-    def __init__(self, df, model_name="cardiffnlp/twitter-roberta-base-sentiment"):
+    def __init__(self, df, model_name="cardiffnlp/twitter-roberta-base-sentiment", backend="pytorch", cache=None):
         """
         Constructor for the sentiment analysis class.
         :param df: Pandas DataFrame containing topics and comments.
         :param model_name: Transformer model for sentiment analysis (default: RoBERTa).
+        :param backend: Inference backend: "pytorch" (fp32), "pytorch-int8" or "onnx".
+        :param cache: Optional SentimentCache; texts already scored are not run through the model again.
         """
         self.df = df.fillna({"comments": ""})  # Fill NaN values with empty string
         self.model_name = model_name
+        self.backend_name = backend
+        self.backend = None
+        self.cache = cache
         self.sentiment_model = None
         self.tokenizer = None
         self.sentiment_df = None
 
-    def initialize_model(self):
+    def initialize_model(self, tokenizer=None, sentiment_model=None):
         """
         Loads the transformer model and tokenizer for sentiment analysis.
+        Both are taken from the process-wide ModelRegistry, so they are only read from disk once.
+        :param tokenizer: Optional tokenizer to use instead of the registry's.
+        :param sentiment_model: Optional model to use instead of the registry's.
         """
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.sentiment_model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        registry = ModelRegistry.shared()
+        if tokenizer is None or sentiment_model is None:
+            shared_tokenizer, shared_model = registry.get_sentiment_model(self.model_name)
+            tokenizer = tokenizer if tokenizer is not None else shared_tokenizer
+            if sentiment_model is None:
+                sentiment_model = shared_model
+                self.backend = registry.get_sentiment_backend(self.model_name, self.backend_name)
+        if self.backend is None:
+            self.backend = create_backend(self.backend_name, self.model_name, sentiment_model, tokenizer)
+        self.tokenizer = tokenizer
+        self.sentiment_model = sentiment_model
 
-    def analyze_sentiment(self, batch_size=16):
+    def analyze_sentiment(self, batch_size=64, progress_callback=None, max_tokens=4096):
         """
         Performs sentiment analysis on the comments column in batches for efficiency.
-        :param batch_size: Number of samples processed in one batch.
+        :param batch_size: Maximum number of samples processed in one batch.
+        :param progress_callback: Optional callable(stage, done, total, detail) called after each batch.
+        :param max_tokens: Token budget per batch (samples x padded length).
         """
         if self.sentiment_model is None or self.tokenizer is None:
             raise ValueError("Sentiment model is not initialized. Call initialize_model() first.")
 
-        # Store sentiment results
-        sentiment_labels = []
-        p_neg_list = []
-        p_neut_list = []
-        p_pos_list = []
-
         texts = self.df["comments"].apply(lambda x: " ".join(x) if isinstance(x, list) else str(x)).astype(str).tolist()
+        results = self.label_texts(texts, batch_size=batch_size, max_tokens=max_tokens,
+                                   progress_callback=progress_callback)
 
-        # Process in batches to speed up inference
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            inputs = self.tokenizer(batch_texts, return_tensors="pt", truncation=True, padding=True, max_length=512)
+        # Store intermediate results
+        self.df["sentiment"] = [result[0] for result in results]
+        self.df["p_neg"] = [result[1] for result in results]
+        self.df["p_neut"] = [result[2] for result in results]
+        self.df["p_pos"] = [result[3] for result in results]
 
-            with torch.no_grad():
-                outputs = self.sentiment_model(**inputs)
+    def label_texts(self, texts, batch_size=64, max_tokens=4096, progress_callback=None):
+        """
+        Returns one (label, p_neg, p_neut, p_pos) tuple per text. With a cache, only texts
+        that were never scored by this model and backend are sent to the model.
+        """
+        # Convert class IDs to labels
+        label_map = {0: "Negative", 1: "Neutral", 2: "Positive"}
 
-            scores = torch.nn.functional.softmax(outputs.logits, dim=-1)
-            sentiment_classes = torch.argmax(scores, dim=-1).tolist()
+        if self.cache is None:
+            keys = list(range(len(texts)))
+            cached = {}
+        else:
+            keys = [self.cache.make_key(self.model_name, self.backend_name, text) for text in texts]
+            cached = self.cache.get_many(keys)
 
-            # Convert class IDs to labels
-            label_map = {0: "Negative", 1: "Neutral", 2: "Positive"}
-            sentiment_labels.extend([label_map[class_id] for class_id in sentiment_classes])
+        # Score each distinct uncached text once
+        first_position = {}
+        for position, key in enumerate(keys):
+            if key not in cached and key not in first_position:
+                first_position[key] = position
+        miss_keys = list(first_position)
+        scores = self.score_texts([texts[first_position[key]] for key in miss_keys], batch_size=batch_size,
+                                  max_tokens=max_tokens, progress_callback=progress_callback)
 
-            # Extract individual probabilities
-            p_neg_list.extend(scores[:, 0].tolist())
-            p_neut_list.extend(scores[:, 1].tolist())
-            p_pos_list.extend(scores[:, 2].tolist())
+        sentiment_classes = torch.argmax(scores, dim=-1).tolist()
+        new_results = {
+            key: (label_map[class_id], *scores[row, :3].tolist())
+            for row, (key, class_id) in enumerate(zip(miss_keys, sentiment_classes))
+        }
+        if self.cache is not None:
+            self.cache.put_many((key, *result) for key, result in new_results.items())
+            logging.info(f"Sentiment cache: {len(texts) - len(miss_keys)} of {len(texts)} texts already scored")
 
-        # Store intermediate results
-        self.df["sentiment"] = sentiment_labels
-        self.df["p_neg"] = p_neg_list
-        self.df["p_neut"] = p_neut_list
-        self.df["p_pos"] = p_pos_list
+        return [cached[key] if key in cached else new_results[key] for key in keys]
+
+    def score_texts(self, texts, batch_size=64, max_tokens=4096, progress_callback=None):
+        """
+        Returns a (len(texts), num_labels) tensor of class probabilities in the order of `texts`.
+        Texts are tokenized once, sorted by length and grouped under a token budget, so short
+        texts are no longer padded to the length of the longest text in their DataFrame slice.
+        """
+        scores = torch.zeros((len(texts), self.sentiment_model.config.num_labels))
+        if not texts:
+            return scores
+
+        encodings = self.tokenizer(texts, truncation=True, max_length=512)
+        lengths = [len(input_ids) for input_ids in encodings["input_ids"]]
+        batches = self.plan_batches(lengths, batch_size, max_tokens)
+
+        for batch_number, indices in enumerate(batches, start=1):
+            with tracing.span("sentiment.batch", tokens=sum(lengths[i] for i in indices)) as batch_span:
+                features = [{key: encodings[key][i] for key in encodings.keys()} for i in indices]
+                inputs = self.tokenizer.pad(features, return_tensors="pt")
+                logits = self.backend.predict_logits(inputs)
+
+                # Scatter the batch back to the original row positions
+                scores[torch.tensor(indices)] = torch.nn.functional.softmax(logits, dim=-1)
+                batch_span.rows = len(indices)
+
+            if progress_callback is not None:
+                progress_callback("sentiment", batch_number, len(batches), "batches inferred")
+
+        return scores
+
+    def check_backend_parity(self, sample_size=256, batch_size=64, max_tokens=4096):
+        """
+        Compares this instance's backend against the fp32 PyTorch model on a sample of the comments.
+        :return: Dict with label agreement, probability drift and timings of both backends.
+        """
+        if self.backend is None:
+            raise ValueError("Sentiment model is not initialized. Call initialize_model() first.")
+
+        texts = self.df["comments"].apply(lambda x: " ".join(x) if isinstance(x, list) else str(x)).astype(str).tolist()
+        texts = texts[:sample_size]
+
+        baseline = RedditSentimentAnalysis(self.df.head(0), model_name=self.model_name, backend="pytorch")
+        baseline.initialize_model()
+
+        start = time.perf_counter()
+        reference = baseline.score_texts(texts, batch_size=batch_size, max_tokens=max_tokens)
+        reference_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate = self.score_texts(texts, batch_size=batch_size, max_tokens=max_tokens)
+        candidate_seconds = time.perf_counter() - start
+
+        drift = (candidate - reference).abs()
+        return {
+            "backend": self.backend_name,
+            "samples": len(texts),
+            "label_agreement": (torch.argmax(candidate, dim=-1) == torch.argmax(reference, dim=-1)).float().mean().item() if texts else 1.0,
+            "max_prob_drift": drift.max().item() if texts else 0.0,
+            "mean_prob_drift": drift.mean().item() if texts else 0.0,
+            "fp32_seconds": reference_seconds,
+            "backend_seconds": candidate_seconds,
+            "speedup": reference_seconds / candidate_seconds if candidate_seconds > 0 else None,
+        }
+
+    @staticmethod
+    def plan_batches(lengths, batch_size, max_tokens):
+        """
+        Groups row indices into batches of similar token length. A batch grows while
+        (rows x longest row) stays within `max_tokens` and rows stay within `batch_size`.
+        """
+        batches = []
+        current = []
+        for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+            # Sorted ascending, so the new row is the longest in the batch
+            if current and (len(current) >= batch_size or (len(current) + 1) * lengths[index] > max_tokens):
+                batches.append(current)
+                current = []
+            current.append(index)
+        if current:
+            batches.append(current)
+        return batches
 
     def finalize_sentiment_dataframe(self):
         """
@@ -74,8 +189,9 @@ class RedditSentimentAnalysis:
         self.df["Date"] = pd.to_datetime(self.df["created"]).dt.date.astype(str)
         self.df["Time"] = pd.to_datetime(self.df["created"]).dt.time.astype(str)
 
+        # id identifies the post in the merged output and the Parquet store
         self.sentiment_df = self.df[[
-            "title", "created", "Date", "Time", "upvote_ratio",
+            "id", "title", "created", "Date", "Time", "upvote_ratio",
              "topic", "sentiment", "p_neg", "p_neut", "p_pos", "url"
         ]].copy()
 
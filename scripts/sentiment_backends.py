@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import tempfile
+import torch
+import transformers
+
+"""
+CPU inference backends for the sentiment model. Every backend takes the
+padded tokenizer output of one batch and returns the logits as a tensor:
+
+    pytorch       - the fp32 AutoModelForSequenceClassification (default)
+    pytorch-int8  - the same model with Linear layers dynamically quantized to int8
+    onnx          - an exported ONNX graph run by ONNX Runtime; the export is
+                    cached on disk and only built once per model revision and
+                    torch/transformers version
+"""
+BACKENDS = ("pytorch", "pytorch-int8", "onnx")
+
+
+class TorchBackend:
+    name = "pytorch"
+
+    def __init__(self, model):
+        self.model = model
+        self.model.eval()
+
+    def predict_logits(self, inputs):
+        with torch.no_grad():
+            return self.model(**inputs).logits
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = "pytorch-int8"
+
+    def __init__(self, model):
+        # quantize_dynamic returns a quantized copy; the fp32 model stays usable
+        super().__init__(torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8))
+
+
+class LogitsOnly(torch.nn.Module):
+    """Wraps a HF classifier so the exported graph has plain tensor inputs and a single output."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+class OnnxBackend:
+    name = "onnx"
+    OPSET_VERSION = 14
+
+    def __init__(self, model_name, model, tokenizer, cache_dir=os.path.join("cache", "onnx")):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            logging.error("onnxruntime is not installed.")
+            raise RuntimeError("The onnx backend needs onnxruntime (pip install onnxruntime).") from e
+
+        self.path = os.path.join(cache_dir, model_name.replace("/", "__"), self.version_stamp(model), "model.onnx")
+        if not os.path.exists(self.path):
+            self.export(model, tokenizer, self.path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    @classmethod
+    def version_stamp(cls, model):
+        """
+        Short hash of the model revision and the library versions that shape the export, so an
+        upgraded model, torch or transformers gets a fresh export instead of a stale one.
+        """
+        config = getattr(model, "config", None)
+        # Set by from_pretrained to the hub commit the weights came from
+        revision = getattr(config, "_commit_hash", None) or getattr(config, "_name_or_path", "")
+        stamp = (f"{revision}|torch={torch.__version__}|transformers={transformers.__version__}"
+                 f"|opset={cls.OPSET_VERSION}")
+        return hashlib.sha256(stamp.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def export(cls, model, tokenizer, path):
+        logging.info(f"Exporting sentiment model to ONNX at {path}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".onnx.tmp")
+        os.close(fd)
+        try:
+            torch.onnx.export(
+                LogitsOnly(model).eval(),
+                (sample["input_ids"], sample["attention_mask"]),
+                tmp_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=cls.OPSET_VERSION,
+            )
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            logging.error(f"ONNX export failed: {e}")
+            raise RuntimeError("Failed to export the sentiment model to ONNX.") from e
+
+    def predict_logits(self, inputs):
+        feeds = {name: tensor.numpy() for name, tensor in inputs.items() if name in self.input_names}
+        return torch.from_numpy(self.session.run(["logits"], feeds)[0])
+
+
+def create_backend(backend, model_name, model, tokenizer):
+    if backend == "pytorch":
+        return TorchBackend(model)
+    if backend == "pytorch-int8":
+        return QuantizedTorchBackend(model)
+    if backend == "onnx":
+        return OnnxBackend(model_name, model, tokenizer)
+    raise ValueError(f"Unknown sentiment backend '{backend}'. Choose one of {', '.join(BACKENDS)}.")
@@ -0,0 +1,86 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from scripts.sqlite_util import select_in
+
+"""
+SentimentCache is a persistent, content-addressed store of sentiment results.
+Entries are keyed by a hash of (model name, backend, normalized text) and hold
+the label and the p_neg/p_neut/p_pos probabilities. The cache is bounded to
+`max_entries`; the least recently used entries are evicted first.
+"""
+class SentimentCache:
+    def __init__(self, db_path=os.path.join("cache", "sentiment_cache.sqlite"), max_entries=500_000):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        try:
+            self.conn = sqlite3.connect(db_path)
+            with self.conn:
+                self.conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS sentiment (
+                        key TEXT PRIMARY KEY,
+                        label TEXT NOT NULL,
+                        p_neg REAL NOT NULL,
+                        p_neut REAL NOT NULL,
+                        p_pos REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_sentiment_last_used ON sentiment (last_used);
+                """)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open sentiment cache {db_path}: {e}")
+            raise RuntimeError("Failed to open sentiment cache.") from e
+
+    @staticmethod
+    def normalize(text):
+        # Whitespace differences should not cause a re-score. Case is kept: the model is cased.
+        return " ".join(str(text).split())
+
+    @classmethod
+    def make_key(cls, model_name, backend, text):
+        payload = "\x1f".join([model_name, backend, cls.normalize(text)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Returns a dict of key -> (label, p_neg, p_neut, p_pos) for the keys that are cached."""
+        found = {}
+        for row in select_in(self.conn, "SELECT key, label, p_neg, p_neut, p_pos FROM sentiment "
+                                        "WHERE key IN ({placeholders})", keys):
+            found[row[0]] = row[1:]
+
+        # Refresh recency of the entries just used
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("UPDATE sentiment SET last_used = ? WHERE key = ?",
+                                  [(now, key) for key in found])
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, entries):
+        """:param entries: Iterable of (key, label, p_neg, p_neut, p_pos)."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sentiment (key, label, p_neg, p_neut, p_pos, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(*entry, now) for entry in entries])
+        self.evict()
+
+    def evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM sentiment WHERE key IN "
+                    "(SELECT key FROM sentiment ORDER BY last_used LIMIT ?)", (excess,))
+            logging.info(f"Evicted {excess} least recently used sentiment cache entries")
+
+    def close(self):
+        self.conn.close()
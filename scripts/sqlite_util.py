@@ -0,0 +1,17 @@
+"""
+Helpers shared by the SQLite-backed caches and stores.
+"""
+# Stay below SQLite's bound-parameter limit (999 before SQLite 3.32)
+MAX_IN_VALUES = 500
+
+
+def select_in(conn, query, values, chunk_size=MAX_IN_VALUES):
+    """
+    Runs `query` for `values` in chunks and yields every result row.
+    :param query: SELECT with one "{placeholders}" slot, e.g. "SELECT ... WHERE id IN ({placeholders})".
+    :param values: Values bound to the IN list; duplicates are sent once.
+    """
+    unique = list(dict.fromkeys(values))
+    for i in range(0, len(unique), chunk_size):
+        chunk = unique[i:i + chunk_size]
+        yield from conn.execute(query.format(placeholders=",".join("?" * len(chunk))), chunk)
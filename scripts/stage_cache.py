@@ -0,0 +1,149 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+"""
+StageCache keeps the output DataFrame of each pipeline stage as Parquet:
+
+    <cache_dir>/<stage>/<fingerprint>.parquet
+
+The fingerprint hashes the stage's parameters (coin, subreddit, window, model
+names, ...), the fingerprints of the stages it consumes and the source code of
+the modules that implement it. A rerun with unchanged inputs loads the stored
+output instead of running the stage; changing a parameter, an upstream stage or
+the code produces a new fingerprint.
+
+Fingerprints include the exact window, so most entries are only ever read by a
+retry of the same run. Every save therefore evicts entries older than
+max_age_days and then the oldest ones until the cache fits in max_mb.
+"""
+STAGE_MODULES = {
+    "numeric": ["scripts.Numeric_Analysis_Subsystem", "scripts.coingecko_api_fetch", "scripts.market_data_cache",
+                "scripts.range_planner", "scripts.market_features", "scripts.http_client"],
+    # Streaming mode stores the reddit, topic and sentiment outputs under these same keys
+    "reddit": ["scripts.reddit_api_fetch", "scripts.reddit_store", "scripts.comment_fetcher", "scripts.streaming"],
+    "topic": ["scripts.topic_model", "scripts.embedding_store"],
+    "sentiment": ["scripts.sentiment_analysis", "scripts.sentiment_backends", "scripts.sentiment_cache",
+                  "scripts.streaming"],
+}
+
+
+class StageCache:
+    _code_versions = {}
+
+    def __init__(self, cache_dir=os.path.join("cache", "stages"), max_age_days=7, max_mb=1024):
+        """
+        :param max_age_days: Entries older than this are evicted.
+        :param max_mb: Size the cache is trimmed to, oldest entries first.
+        """
+        self.cache_dir = cache_dir
+        self.max_age_seconds = max_age_days * 86400
+        self.max_bytes = max_mb * 2 ** 20
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def code_version(cls, stage):
+        """Hash of the source files of the modules implementing `stage`."""
+        if stage not in cls._code_versions:
+            digest = hashlib.sha256()
+            for module in STAGE_MODULES.get(stage, []):
+                spec = importlib.util.find_spec(module)
+                if spec is None or not spec.origin or not os.path.exists(spec.origin):
+                    digest.update(module.encode("utf-8"))
+                    continue
+                with open(spec.origin, "rb") as source:
+                    digest.update(source.read())
+            cls._code_versions[stage] = digest.hexdigest()
+        return cls._code_versions[stage]
+
+    @classmethod
+    def fingerprint(cls, stage, params, inputs=()):
+        """
+        :param params: JSON-serialisable parameters of the stage (datetimes are stringified).
+        :param inputs: Fingerprints of the upstream stages the stage consumes.
+        """
+        payload = json.dumps({
+            "stage": stage,
+            "params": params,
+            "inputs": list(inputs),
+            "code": cls.code_version(stage),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, stage, fingerprint):
+        return os.path.join(self.cache_dir, stage, f"{fingerprint}.parquet")
+
+    def load(self, stage, fingerprint):
+        """Returns the stored DataFrame, or None if the stage has not been cached."""
+        path = self.path(stage, fingerprint)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable stage cache {path}: {e}")
+            self.misses += 1
+            return None
+        # Parquet returns list columns (e.g. Reddit comments) as numpy arrays
+        for column in df.columns[df.dtypes == object]:
+            if df[column].map(lambda value: isinstance(value, np.ndarray)).any():
+                df[column] = df[column].map(lambda value: value.tolist() if isinstance(value, np.ndarray) else value)
+        self.hits += 1
+        logging.info(f"Stage '{stage}' loaded from cache ({len(df)} rows)")
+        return df
+
+    def save(self, stage, fingerprint, df):
+        """Stores the stage output. Failures are logged and do not fail the run."""
+        path = self.path(stage, fingerprint)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".parquet.tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Could not cache output of stage '{stage}': {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Removes entries past max_age_days, then the oldest entries until the cache fits in max_mb.
+        :param keep: Path of an entry that is never evicted (the one just saved).
+        """
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".parquet") and path != keep:
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries) + (os.path.getsize(keep) if keep and os.path.exists(keep) else 0)
+        cutoff = time.time() - self.max_age_seconds
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"Could not evict stage cache entry {path}: {e}")
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logging.info(f"Evicted {removed} stage cache entries ({total / 2 ** 20:.1f} MB left)")
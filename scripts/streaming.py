@@ -0,0 +1,177 @@
+import logging
+import queue
+import threading
+import time
+import pandas as pd
+from scripts import tracing
+from scripts.pipeline import AnalysisCancelled
+
+"""
+PostStream overlaps Reddit I/O with sentiment inference. Instead of waiting for
+the complete post DataFrame, posts flow through a bounded queue as they are
+fetched:
+
+    reddit thread   RedditAPI.stream_posts(): listing pages are synced and matched
+                    posts are hydrated by the comment workers while the listing goes on
+    posts queue     at most `queue_size` records; the reddit thread blocks when
+                    inference falls behind, so memory is bounded by the queue depth
+    caller thread   takes micro-batches off the queue and scores them with
+                    RedditSentimentAnalysis.label_texts() while the reddit thread keeps fetching
+
+The end-to-end time approaches max(I/O, inference) instead of their sum. Topic
+modelling needs the whole corpus, so it runs on the accumulated posts afterwards.
+"""
+_END_OF_STREAM = object()
+
+
+class PostStream:
+    def __init__(self, reddit_factory, sentiment_analysis, micro_batch_size=32, queue_size=256,
+                 batch_size=64, max_tokens=4096, linger_seconds=0.5, progress_callback=None,
+                 cancel_event=None):
+        """
+        :param reddit_factory: Callable returning a RedditAPI; called on the reddit thread, which
+            then owns its SQLite store connection.
+        :param sentiment_analysis: RedditSentimentAnalysis with the model already initialised.
+        :param micro_batch_size: Most posts scored per label_texts() call.
+        :param queue_size: Capacity of the posts queue (also caps posts waiting for comments).
+        :param batch_size: Maximum texts per inference batch inside a micro-batch.
+        :param max_tokens: Token budget per inference batch.
+        :param linger_seconds: How long a partial micro-batch waits for more posts before it is scored.
+        :param progress_callback: Optional callable(stage, done, total, detail), called on the caller thread.
+        :param cancel_event: Optional threading.Event; when set, streaming stops at the next micro-batch.
+        """
+        self.reddit_factory = reddit_factory
+        self.sentiment_analysis = sentiment_analysis
+        self.micro_batch_size = micro_batch_size
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.linger_seconds = linger_seconds
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+
+        self.posts = queue.Queue(maxsize=queue_size)
+        self.stop = threading.Event()
+        self.comment_stats = {}
+        self.stats = {"posts": 0, "micro_batches": 0, "inference_seconds": 0.0, "wait_seconds": 0.0}
+
+    def run(self):
+        """
+        Streams and scores every matched post.
+        :return: (posts, scores): the post records (newest first, like search_subreddit) and
+            their sentiment as id, sentiment, p_neg, p_neut, p_pos.
+        """
+        producer = threading.Thread(target=self.produce, name="stream-reddit", daemon=True)
+        producer.start()
+        try:
+            records, scores = self.consume()
+        finally:
+            # Unblocks the reddit thread if the consumer stopped early
+            self.stop.set()
+            producer.join()
+
+        if not records:
+            logging.error("No reddit posts matched the given criteria.")
+            raise RuntimeError("No reddit posts matched the given criteria.")
+        posts_df = pd.DataFrame(records).sort_values("created", ascending=False, kind="stable")
+        logging.info(f"Streamed {self.stats['posts']} posts in {self.stats['micro_batches']} micro-batches "
+                     f"({self.stats['inference_seconds']:.1f}s inference, "
+                     f"{self.stats['wait_seconds']:.1f}s waiting for posts)")
+        return posts_df.reset_index(drop=True), pd.DataFrame(scores)
+
+    def produce(self):
+        try:
+            reddit_api = self.reddit_factory()
+            records = reddit_api.stream_posts(max_pending=self.queue_size)
+            try:
+                for record in records:
+                    if not self.put(record):
+                        return
+            finally:
+                # Runs stream_posts' own cleanup (comment workers, final counts) before the stats are read
+                records.close()
+                self.comment_stats = reddit_api.comment_stats
+                reddit_api.store.close()
+        except Exception as e:
+            # Handed to the consumer, which raises it on the caller thread
+            self.put(e)
+            return
+        self.put(_END_OF_STREAM)
+
+    def put(self, item):
+        """Blocks while the queue is full. :return: False if the stream was stopped meanwhile."""
+        while not self.stop.is_set():
+            try:
+                self.posts.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, timeout):
+        try:
+            return self.posts.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            logging.info("Analysis cancelled by user.")
+            raise AnalysisCancelled("Analysis cancelled.")
+
+    def next_micro_batch(self):
+        """
+        Waits for the next posts: up to micro_batch_size records, or fewer once linger_seconds
+        pass without the batch filling up.
+        :return: (records, finished)
+        """
+        records = []
+        deadline = None
+        while len(records) < self.micro_batch_size:
+            if deadline is None:
+                self.check_cancelled()
+                timeout = 0.2
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            item = self.get(timeout)
+            if item is None:
+                continue
+            if item is _END_OF_STREAM:
+                return records, True
+            if isinstance(item, Exception):
+                raise item
+            records.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.linger_seconds
+        return records, False
+
+    def consume(self):
+        records = []
+        scores = []
+        finished = False
+        while not finished:
+            wait_start = time.perf_counter()
+            batch, finished = self.next_micro_batch()
+            self.stats["wait_seconds"] += time.perf_counter() - wait_start
+            if not batch:
+                continue
+
+            texts = [" ".join(record["comments"]) if isinstance(record["comments"], list)
+                     else str(record["comments"]) for record in batch]
+            inference_start = time.perf_counter()
+            with tracing.span("stream.micro_batch", posts=len(batch)) as batch_span:
+                results = self.sentiment_analysis.label_texts(texts, batch_size=self.batch_size,
+                                                              max_tokens=self.max_tokens)
+                batch_span.rows = len(batch)
+            self.stats["inference_seconds"] += time.perf_counter() - inference_start
+            self.stats["micro_batches"] += 1
+            self.stats["posts"] += len(batch)
+
+            records.extend(batch)
+            scores.extend({"id": record["id"], "sentiment": label, "p_neg": p_neg, "p_neut": p_neut,
+                           "p_pos": p_pos} for record, (label, p_neg, p_neut, p_pos) in zip(batch, results))
+            if self.progress_callback is not None:
+                self.progress_callback("sentiment", len(records), None, "posts streamed and scored")
+        return records, scores
@@ -1,29 +1,118 @@
+import json
+import os
+import time
+import numpy as np
 import pandas as pd
 from bertopic import BERTopic
+from bertopic.vectorizers import OnlineCountVectorizer
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
 from umap import UMAP
 from hdbscan import HDBSCAN
-from sentence_transformers import SentenceTransformer
 import logging
+from scripts import tracing
+from scripts.model_registry import ModelRegistry
+
+"""
+RedditTopicModel runs BERTopic over the comments of Reddit posts.
+
+mode="full" fits a fresh UMAP/HDBSCAN BERTopic model on every run.
+
+mode="incremental" keeps one online model per subreddit under
+<model_dir>/<subreddit>/ (IncrementalPCA + MiniBatchKMeans + OnlineCountVectorizer,
+so it supports partial_fit and topic ids stay the same from run to run):
+
+    bertopic        - the saved BERTopic model (without the embedding model)
+    state.json      - baseline drift, runs since the last update, refit count
+    centroids.npz   - mean document embedding per topic
+
+New documents are assigned with transform(). Drift is the mean cosine distance
+from each document to the centroid of its assigned topic; when it exceeds the
+baseline measured at fit time by more than `drift_threshold`, the model is
+refitted from scratch. Every `update_every` runs the model is updated with
+partial_fit on the new documents.
+
+In full mode the clustering strategy is picked by corpus size ("auto"):
+
+    small     - fewer than 10 documents
+    standard  - UMAP + HDBSCAN over every document
+    sampled   - large corpora: UMAP + HDBSCAN are fitted on a sample stratified
+                by day, and all documents are then assigned with transform() in
+                chunks, so memory is bounded by the sample and chunk sizes
+"""
+INCREMENTAL_COMPONENTS = 5
+LARGE_CORPUS_DOCS = 20_000
+# Rough working memory of a UMAP + HDBSCAN fit per document (kNN graph, fuzzy graph, MST)
+FIT_BYTES_PER_DOC = 32 * 1024
 
 
 class RedditTopicModel:
-    def __init__(self, df, model_name="all-MiniLM-L6-v2"):
+    def __init__(self, df, model_name="all-MiniLM-L6-v2", embedding_store=None, mode="full",
+                 subreddit=None, model_dir="topic_models", drift_threshold=0.25, update_every=1,
+                 n_topics=20, strategy="auto", memory_limit_mb=2048, sample_size=10_000, chunk_size=5_000):
+        """
+        :param embedding_store: Optional EmbeddingStore reusing vectors across runs.
+        :param mode: "full" (refit every run) or "incremental" (reuse the subreddit's saved model).
+        :param subreddit: Subreddit the saved model belongs to (required for incremental mode).
+        :param drift_threshold: Relative increase over the baseline drift that triggers a full refit.
+        :param update_every: Runs between partial_fit updates of a saved model.
+        :param n_topics: Number of topics of the online model (reduced for small corpora).
+        :param strategy: "auto", "small", "standard" or "sampled" (full mode only).
+        :param memory_limit_mb: Memory ceiling for the UMAP/HDBSCAN fit; larger corpora are sampled.
+        :param sample_size: Documents the sampled strategy fits on (capped by memory_limit_mb).
+        :param chunk_size: Documents embedded and assigned at a time by the sampled strategy.
+        """
+        if strategy not in ("auto", "small", "standard", "sampled"):
+            raise ValueError(f"Unknown topic strategy '{strategy}'.")
+        if mode not in ("full", "incremental"):
+            raise ValueError(f"Unknown topic mode '{mode}'. Choose 'full' or 'incremental'.")
+        if mode == "incremental" and not subreddit:
+            raise ValueError("Incremental topic modelling needs a subreddit.")
         self.df = df.fillna({"comments": ""})  # Fill NaN comments with empty string
         self.model_name = model_name
+        self.embedding_store = embedding_store
+        self.mode = mode
+        self.subreddit = subreddit
+        self.model_path = os.path.join(model_dir, str(subreddit).lower()) if subreddit else None
+        self.drift_threshold = drift_threshold
+        self.update_every = update_every
+        self.n_topics = n_topics
+        self.drift = None
+        self.refitted = False
+        self.strategy = strategy
+        self.memory_limit_mb = memory_limit_mb
+        self.sample_size = sample_size
+        self.chunk_size = chunk_size
+        self.embedding_model = None
+        self.embeddings = None
         self.topic_model = None
         self.topics = None
         self.probs = None
         self.topic_df = None
         self.filtered_topic_df = None
 
-    def initialize_model(self):
-        embedding_model = SentenceTransformer(self.model_name)
+    def initialize_model(self, embedding_model=None):
+        # The embedding model is loaded once per process and shared across runs
+        if embedding_model is None:
+            embedding_model = ModelRegistry.shared().get_embedding_model(self.model_name)
+        self.embedding_model = embedding_model
         dataset_size = len(self.df)
 
-        if dataset_size < 10:
+        if self.mode == "incremental":
+            # The saved model (or a new online model) is set up in fit_transform()
+            return
+
+        self.strategy = self.choose_strategy(dataset_size)
+        if self.strategy == "small":
             logging.info("Using small dataset optimisation for topic modelling")
             umap_model = UMAP(n_components=2, n_neighbors=2, min_dist=0.1, metric="cosine")
             hdbscan_model = HDBSCAN(min_cluster_size=2, min_samples=1)
+        elif self.strategy == "sampled":
+            logging.info(f"Using sampled large corpus strategy for topic modelling "
+                         f"({dataset_size} documents, sample of {self.fit_sample_size()})")
+            umap_model = UMAP(n_components=5, n_neighbors=15, min_dist=0.1, metric="cosine", low_memory=True)
+            # prediction_data lets transform() assign documents outside the sample
+            hdbscan_model = HDBSCAN(min_cluster_size=15, min_samples=5, prediction_data=True)
         else:
             logging.info("Using large dataset optimisation for topic modelling")
             umap_model = UMAP(n_components=5, n_neighbors=15, min_dist=0.1, metric="cosine")
@@ -36,8 +125,21 @@ class RedditTopicModel:
             nr_topics="auto"
         )
 
-    def fit_transform(self):
-        if self.topic_model is None:
+    def choose_strategy(self, dataset_size):
+        if self.strategy != "auto":
+            return self.strategy
+        if dataset_size < 10:
+            return "small"
+        fit_mb = dataset_size * FIT_BYTES_PER_DOC / 2 ** 20
+        if dataset_size > LARGE_CORPUS_DOCS or fit_mb > self.memory_limit_mb:
+            return "sampled"
+        return "standard"
+
+    def fit_sample_size(self):
+        return max(10, min(self.sample_size, int(self.memory_limit_mb * 2 ** 20 // FIT_BYTES_PER_DOC)))
+
+    def fit_transform(self, progress_callback=None):
+        if self.embedding_model is None or (self.mode == "full" and self.topic_model is None):
             logging.error("Topic model is not initialized. Call initialize_model() first")
             raise ValueError("Topic model is not initialized.")
 
@@ -47,8 +149,195 @@ class RedditTopicModel:
 
         logging.info(f"\nRunning BERTopic on {len(self.df)} Reddit post comments...")
 
-        comment_texts = self.df["comments"].apply(lambda x: " ".join(x) if isinstance(x, list) else str(x))
-        self.topics, self.probs = self.topic_model.fit_transform(comment_texts)
+        comment_texts = self.df["comments"].apply(lambda x: " ".join(x) if isinstance(x, list) else str(x)).tolist()
+
+        if self.mode == "full" and self.strategy == "sampled":
+            self.fit_sampled(comment_texts, progress_callback)
+            return
+
+        # Precomputed embeddings: only texts not seen in earlier runs are encoded
+        if self.embedding_store is not None:
+            self.embeddings = self.embedding_store.get_embeddings(comment_texts, self.embedding_model)
+
+        if self.mode == "incremental":
+            self.fit_incremental(comment_texts)
+            return
+
+        with tracing.span("topic.fit", documents=len(comment_texts)) as fit_span:
+            self.topics, self.probs = self.topic_model.fit_transform(comment_texts, embeddings=self.embeddings)
+            fit_span.rows = len(comment_texts)
+
+    def embed(self, texts):
+        if self.embedding_store is not None:
+            return self.embedding_store.get_embeddings(texts, self.embedding_model)
+        return np.asarray(self.embedding_model.encode(texts, show_progress_bar=False), dtype=np.float32)
+
+    def fit_sampled(self, comment_texts, progress_callback=None):
+        """Fits on a per-day stratified sample, then assigns every document in chunks."""
+        if "created" in self.df:
+            days = pd.to_datetime(self.df["created"], errors="coerce", utc=True).dt.date
+        else:
+            days = pd.Series(0, index=self.df.index)
+        sample = self.stratified_sample(days, self.fit_sample_size())
+        sample_texts = [comment_texts[i] for i in sample]
+        logging.info(f"Fitting topic model on {len(sample_texts)} of {len(comment_texts)} documents "
+                     f"across {days.nunique()} days")
+        with tracing.span("topic.fit", documents=len(sample_texts)) as fit_span:
+            self.topic_model.fit(sample_texts, embeddings=self.embed(sample_texts))
+            fit_span.rows = len(sample_texts)
+
+        # Embeddings are only held for one chunk at a time
+        topics = np.empty(len(comment_texts), dtype=int)
+        for start in range(0, len(comment_texts), self.chunk_size):
+            chunk = comment_texts[start:start + self.chunk_size]
+            with tracing.span("topic.assign_chunk") as chunk_span:
+                chunk_topics, _ = self.topic_model.transform(chunk, embeddings=self.embed(chunk))
+                topics[start:start + len(chunk)] = chunk_topics
+                chunk_span.rows = len(chunk)
+            if progress_callback is not None:
+                progress_callback("topic", start + len(chunk), len(comment_texts), "documents assigned")
+        self.topics = topics.tolist()
+        self.probs = None
+
+    @staticmethod
+    def stratified_sample(days, sample_size, seed=42):
+        """
+        Positions of a sample of about `sample_size` documents, drawn from every day in
+        proportion to its volume (at least one document per day).
+        """
+        days = pd.Series(days).reset_index(drop=True)
+        if sample_size >= len(days):
+            return np.arange(len(days))
+        rng = np.random.default_rng(seed)
+        fraction = sample_size / len(days)
+        picked = []
+        for positions in days.groupby(days, dropna=True).indices.values():
+            take = min(len(positions), max(1, round(len(positions) * fraction)))
+            picked.append(rng.choice(positions, size=take, replace=False))
+        if not picked:
+            return np.sort(rng.choice(len(days), size=sample_size, replace=False))
+        return np.sort(np.concatenate(picked))
+
+    def fit_incremental(self, comment_texts):
+        """Assigns topics with the subreddit's saved model, updating or refitting it as needed."""
+        if self.embeddings is None:
+            self.embeddings = self.embed(comment_texts)
+
+        state = self.load_state()
+        if state is None:
+            logging.info(f"No saved topic model for r/{self.subreddit}; fitting a new one")
+            self.refit_online(comment_texts, refits=0)
+            return
+
+        self.load_model(os.path.join(self.model_path, "bertopic"))
+        centroids = self.load_centroids()
+        self.topics, self.probs = self.topic_model.transform(comment_texts, embeddings=self.embeddings)
+        self.topics = [int(topic) for topic in self.topics]
+
+        self.drift = self.topic_drift(self.embeddings, self.topics, centroids)
+        baseline = state["baseline_drift"]
+        logging.info(f"Topic drift for r/{self.subreddit}: {self.drift:.4f} (baseline {baseline:.4f})")
+        if baseline > 0 and self.drift > baseline * (1 + self.drift_threshold):
+            logging.info(f"Topic drift exceeds the {self.drift_threshold:.0%} threshold; refitting")
+            self.refit_online(comment_texts, refits=state["refits"] + 1)
+            return
+
+        state["runs_since_update"] += 1
+        if state["runs_since_update"] >= self.update_every and len(comment_texts) >= INCREMENTAL_COMPONENTS:
+            # Online update: clusters, vocabulary and topic representations absorb the new documents
+            self.topic_model.partial_fit(comment_texts, embeddings=self.embeddings)
+            self.topics = [int(topic) for topic in self.topic_model.topics_]
+            self.update_centroids(centroids, self.embeddings, self.topics)
+            self.topic_model.save(os.path.join(self.model_path, "bertopic"), save_embedding_model=False)
+            self.save_centroids(centroids)
+            state["runs_since_update"] = 0
+            state["updated_at"] = time.time()
+            logging.info(f"Updated topic model for r/{self.subreddit} with {len(comment_texts)} documents")
+        self.save_state(state)
+
+    def refit_online(self, comment_texts, refits):
+        if len(comment_texts) < INCREMENTAL_COMPONENTS:
+            raise ValueError(f"Need at least {INCREMENTAL_COMPONENTS} posts to fit an incremental topic model.")
+
+        n_topics = max(2, min(self.n_topics, len(comment_texts) // INCREMENTAL_COMPONENTS))
+        self.topic_model = BERTopic(
+            embedding_model=self.embedding_model,
+            umap_model=IncrementalPCA(n_components=INCREMENTAL_COMPONENTS),
+            hdbscan_model=MiniBatchKMeans(n_clusters=n_topics, random_state=42, n_init=3),
+            vectorizer_model=OnlineCountVectorizer(stop_words="english", decay=0.01),
+        )
+        self.topic_model.partial_fit(comment_texts, embeddings=self.embeddings)
+        self.topics = [int(topic) for topic in self.topic_model.topics_]
+        self.probs = None
+        self.refitted = True
+
+        centroids = {}
+        self.update_centroids(centroids, self.embeddings, self.topics)
+        self.drift = self.topic_drift(self.embeddings, self.topics, centroids)
+
+        os.makedirs(self.model_path, exist_ok=True)
+        self.topic_model.save(os.path.join(self.model_path, "bertopic"), save_embedding_model=False)
+        self.save_centroids(centroids)
+        self.save_state({
+            "baseline_drift": self.drift,
+            "runs_since_update": 0,
+            "refits": refits,
+            "n_topics": n_topics,
+            "embedding_model": self.model_name,
+            "updated_at": time.time(),
+        })
+        logging.info(f"Fitted topic model for r/{self.subreddit}: {n_topics} topics, "
+                     f"baseline drift {self.drift:.4f}")
+
+    @staticmethod
+    def topic_drift(embeddings, topics, centroids):
+        """Mean cosine distance between each document and the centroid of its topic."""
+        distances = []
+        for embedding, topic in zip(embeddings, topics):
+            if topic in centroids:
+                centroid = centroids[topic][0]
+                norm = np.linalg.norm(embedding) * np.linalg.norm(centroid)
+                distances.append(1.0 - float(np.dot(embedding, centroid) / norm) if norm else 1.0)
+        return float(np.mean(distances)) if distances else 0.0
+
+    @staticmethod
+    def update_centroids(centroids, embeddings, topics):
+        """Folds documents into the running mean embedding per topic ({topic: (centroid, count)})."""
+        topics = np.asarray(topics)
+        for topic in np.unique(topics):
+            members = embeddings[topics == topic]
+            centroid, count = centroids.get(int(topic), (np.zeros(embeddings.shape[1]), 0))
+            total = count + len(members)
+            centroids[int(topic)] = ((centroid * count + members.sum(axis=0)) / total, total)
+
+    def load_state(self):
+        state_path = os.path.join(self.model_path, "state.json")
+        if not os.path.exists(state_path) or not os.path.exists(os.path.join(self.model_path, "bertopic")):
+            return None
+        with open(state_path) as state_file:
+            state = json.load(state_file)
+        if state.get("embedding_model") != self.model_name:
+            logging.info("Saved topic model used a different embedding model; it will be refitted")
+            return None
+        return state
+
+    def save_state(self, state):
+        state_path = os.path.join(self.model_path, "state.json")
+        with open(state_path + ".tmp", "w") as state_file:
+            json.dump(state, state_file, indent=2)
+        os.replace(state_path + ".tmp", state_path)
+
+    def load_centroids(self):
+        with np.load(os.path.join(self.model_path, "centroids.npz")) as data:
+            return {int(topic): (centroid, int(count))
+                    for topic, centroid, count in zip(data["topics"], data["centroids"], data["counts"])}
+
+    def save_centroids(self, centroids):
+        topics = sorted(centroids)
+        np.savez(os.path.join(self.model_path, "centroids.npz"),
+                 topics=np.array(topics),
+                 centroids=np.array([centroids[topic][0] for topic in topics]),
+                 counts=np.array([centroids[topic][1] for topic in topics]))
 
     def process_topics(self, top_n=5):
         if self.topics is None:
@@ -84,4 +373,4 @@ class RedditTopicModel:
         self.topic_model.save(save_path)
 
     def load_model(self, load_path="bertopic_model"):
-        self.topic_model = BERTopic.load(load_path)
\ No newline at end of file
+        self.topic_model = BERTopic.load(load_path, embedding_model=self.embedding_model)
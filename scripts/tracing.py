@@ -0,0 +1,234 @@
+import contextlib
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from scripts.model_registry import current_rss_bytes
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+"""
+Structured tracing for pipeline runs. A span records, for one stage or one
+inner-loop step (listing page, comment fetch, inference batch):
+
+    wall_seconds, cpu_seconds   elapsed and process CPU time
+    rows                        rows/items the span produced, when set
+    rss_mb, peak_rss_mb         resident memory at the end and the process high-water mark
+    api_calls                   API requests made while the span was open, per API (by any
+                                thread for spans on the tracing thread, by its own thread for
+                                spans on worker threads)
+
+Spans are written as JSON lines by a QueueListener thread, so emitting a span
+never blocks on file I/O. Code can always call span()/start_span(): without an
+active Tracer they are no-ops.
+
+    with Tracer("traces/run.jsonl") as tracer:
+        with span("reddit", subreddit="dogecoin") as reddit_span:
+            ...
+            reddit_span.rows = len(df)
+        print(tracer.format_summary())
+"""
+
+_api_calls = Counter()
+_api_calls_lock = threading.Lock()
+_thread_api_calls = threading.local()
+_active = None
+
+
+def count_api_call(api, amount=1):
+    """Counts requests to an external API ("coingecko", "reddit", ...)."""
+    with _api_calls_lock:
+        _api_calls[api] += amount
+    if not hasattr(_thread_api_calls, "counts"):
+        _thread_api_calls.counts = Counter()
+    _thread_api_calls.counts[api] += amount
+
+
+def api_call_counts(thread_only=False):
+    """Requests made so far by the whole process, or by the calling thread only."""
+    if thread_only:
+        return dict(getattr(_thread_api_calls, "counts", {}))
+    with _api_calls_lock:
+        return dict(_api_calls)
+
+
+def peak_rss_bytes():
+    """Highest resident set size of the process so far (current RSS where unavailable)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    return current_rss_bytes()
+
+
+def to_mb(value):
+    return round(value / 2 ** 20, 1) if value else None
+
+
+class Span:
+    def __init__(self, tracer, name, parent_id, attrs):
+        self.tracer = tracer
+        self.id = next(tracer.ids)
+        self.name = name
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.rows = None
+        # Spans on worker threads overlap their siblings, so they only count their own thread's calls
+        self.thread_only = threading.get_ident() != tracer.owner_thread
+        self.started_at = time.time()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.start_api_calls = api_call_counts(self.thread_only)
+
+    def end(self, error=None):
+        api_calls = {api: count - self.start_api_calls.get(api, 0)
+                     for api, count in api_call_counts(self.thread_only).items()
+                     if count != self.start_api_calls.get(api, 0)}
+        self.tracer.record({
+            "span_id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "thread": threading.current_thread().name,
+            "started_at": self.started_at,
+            "wall_seconds": round(time.perf_counter() - self.start_wall, 6),
+            "cpu_seconds": round(time.process_time() - self.start_cpu, 6),
+            "rows": self.rows,
+            "rss_mb": to_mb(current_rss_bytes()),
+            "peak_rss_mb": to_mb(peak_rss_bytes()),
+            "api_calls": api_calls,
+            "error": error,
+            **self.attrs,
+        })
+
+
+class NullSpan:
+    """Stands in for a span when no tracer is active."""
+    rows = None
+
+    def end(self, error=None):
+        pass
+
+
+class Tracer:
+    def __init__(self, path):
+        """:param path: JSON lines file receiving one record per finished span."""
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ids = itertools.count(1)
+        self.records = []
+        self.records_lock = threading.Lock()
+        self.stacks = {}  # thread id -> open context spans
+        self.owner_thread = threading.get_ident()
+
+        self.file_handler = logging.FileHandler(path, encoding="utf-8")
+        self.file_handler.setFormatter(logging.Formatter("%(message)s"))
+        self.queue = queue.Queue(-1)
+        self.listener = logging.handlers.QueueListener(self.queue, self.file_handler)
+        self.logger = logging.getLogger(f"sentimeme.trace.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(logging.handlers.QueueHandler(self.queue))
+
+    def start(self):
+        global _active
+        self.owner_thread = threading.get_ident()
+        self.listener.start()
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        self.listener.stop()
+        self.file_handler.close()
+        self.logger.handlers.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stack(self, thread_id=None):
+        with self.records_lock:
+            return self.stacks.setdefault(thread_id or threading.get_ident(), [])
+
+    def current_parent(self):
+        # Worker threads (e.g. comment fetchers) attach to the innermost span of the tracing thread
+        stack = self.stack() or self.stack(self.owner_thread)
+        return stack[-1].id if stack else None
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        current = Span(self, name, self.current_parent(), attrs)
+        stack = self.stack()
+        stack.append(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.end(error=type(e).__name__)
+            raise
+        else:
+            current.end()
+        finally:
+            stack.pop()
+
+    def start_span(self, name, **attrs):
+        """A span ended explicitly with end(); for steps that do not fit a with block (e.g. generators)."""
+        return Span(self, name, self.current_parent(), attrs)
+
+    def record(self, record):
+        with self.records_lock:
+            self.records.append(record)
+        self.logger.info(json.dumps(record, default=str))
+
+    def summary(self):
+        """Per span name: count, total wall/CPU seconds, rows, peak RSS and API calls."""
+        summary = {}
+        with self.records_lock:
+            records = list(self.records)
+        for record in records:
+            stats = summary.setdefault(record["name"], {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                                                        "rows": 0, "peak_rss_mb": None, "api_calls": 0,
+                                                        "errors": 0})
+            stats["count"] += 1
+            stats["wall_seconds"] += record["wall_seconds"]
+            stats["cpu_seconds"] += record["cpu_seconds"]
+            stats["rows"] += record["rows"] or 0
+            stats["api_calls"] += sum(record["api_calls"].values())
+            stats["errors"] += record["error"] is not None
+            if record["peak_rss_mb"] is not None:
+                stats["peak_rss_mb"] = max(stats["peak_rss_mb"] or 0, record["peak_rss_mb"])
+        return summary
+
+    def format_summary(self):
+        lines = [f"{'span':<24} {'count':>6} {'wall s':>9} {'cpu s':>9} {'rows':>8} {'peak MB':>8} {'api':>5}"]
+        for name, stats in self.summary().items():
+            peak = f"{stats['peak_rss_mb']:.0f}" if stats["peak_rss_mb"] is not None else "-"
+            lines.append(f"{name:<24} {stats['count']:>6} {stats['wall_seconds']:>9.2f} "
+                         f"{stats['cpu_seconds']:>9.2f} {stats['rows']:>8} {peak:>8} {stats['api_calls']:>5}")
+        return "\n".join(lines)
+
+
+def span(name, **attrs):
+    """Context manager timing a block in the active tracer (a no-op without one)."""
+    tracer = _active
+    if tracer is None:
+        return contextlib.nullcontext(NullSpan())
+    return tracer.span(name, **attrs)
+
+
+def start_span(name, **attrs):
+    tracer = _active
+    return tracer.start_span(name, **attrs) if tracer is not None else NullSpan()